@@ -1,38 +1,202 @@
-from openai import OpenAI
-import base64
+from pybase64 import b64encode
+from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, InternalServerError, OpenAI, RateLimitError
+import asyncio
+import atexit
+import hashlib
 import io
+import random
+import threading
 
 import re
 
+from converter.llm_cache import LLMCache, make_key
+from converter.rate_limit import rate_limiter
+
+_LATEX_BLOCK_RE = re.compile(r'\\\[(.*?)\\\]', re.DOTALL)
+_LATEX_INLINE_RE = re.compile(r'\\\((.*?)\\\)', re.DOTALL)
+_MD_FENCE_START = re.compile(r'^```(?:markdown)?\s*')
+_MD_FENCE_END = re.compile(r'\s*```\s*$')
+_PAGE_MARKER_RE = re.compile(r'^[ \t]*=== PAGE (\d+) ===[ \t]*$', re.MULTILINE)
+_DURATION_PART_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+
+# Transient failures worth retrying; anything else is reported immediately.
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+RETRY_ATTEMPTS = 6
+RETRY_MIN_WAIT = 1.0
+RETRY_MAX_WAIT = 60.0
+# Upper bound on requests in flight across every file being converted.
+MAX_INFLIGHT_REQUESTS = 8
+# Input tokens billed for one high-detail page image (4 tiles at 1600 px).
+IMAGE_TOKEN_ESTIMATE = 765
+# Seconds the Settings "Test Key" check waits before giving up (client default is 600).
+KEY_CHECK_TIMEOUT = 15.0
+
+
+def _retry_delay(exc: Exception, attempt: int) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based).
+    Honors Retry-After / x-ratelimit-reset-requests when the server sends
+    them, otherwise uses exponential backoff with full jitter.
+    """
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return min(RETRY_MAX_WAIT, float(retry_after))
+        except ValueError:
+            pass
+    reset = headers.get("x-ratelimit-reset-requests")
+    if reset:
+        units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+        seconds = sum(float(value) * units[unit] for value, unit in _DURATION_PART_RE.findall(reset))
+        if seconds > 0:
+            return min(RETRY_MAX_WAIT, seconds)
+    return random.uniform(RETRY_MIN_WAIT, min(RETRY_MAX_WAIT, RETRY_MIN_WAIT * 2 ** (attempt + 1)))
+
+# Process-wide OpenAI clients, one pair per API key, and the event loop that
+# owns the async ones. Keeping them alive lets every page and every file reuse
+# warm pooled connections instead of paying a TLS handshake per PDF. A pair is
+# never closed while the app runs: agents created with an older key (e.g. a
+# batch still running when "Test Key" checks a new one) keep using theirs.
+_SHARED_LOCK = threading.Lock()
+_SHARED_CLIENTS: dict[str, tuple[OpenAI, AsyncOpenAI]] = {}
+_LOOP: asyncio.AbstractEventLoop | None = None
+_REQUEST_SLOTS: asyncio.Semaphore | None = None
+# API keys already proven valid during this session (by validation or a successful call).
+_VALIDATED_KEYS: set[str] = set()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _LOOP
+    with _SHARED_LOCK:
+        if _LOOP is None or _LOOP.is_closed():
+            _LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_LOOP.run_forever, name="openai-loop", daemon=True).start()
+        return _LOOP
+
+
+def _request_slots() -> asyncio.Semaphore:
+    """
+    Loop-wide semaphore shared by all conversions; only touched on the loop thread.
+    """
+    global _REQUEST_SLOTS
+    if _REQUEST_SLOTS is None:
+        _REQUEST_SLOTS = asyncio.Semaphore(MAX_INFLIGHT_REQUESTS)
+    return _REQUEST_SLOTS
+
+
+def run_async(coro):
+    """
+    Runs a coroutine on the shared OpenAI event loop and waits for its result.
+    Safe to call from any thread; the async client stays bound to one loop.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+
+def _get_clients(api_key: str) -> tuple[OpenAI, AsyncOpenAI]:
+    with _SHARED_LOCK:
+        clients = _SHARED_CLIENTS.get(api_key)
+        if clients is None:
+            # Retries are handled by AIAgent so the SDK's own loop is disabled.
+            clients = _SHARED_CLIENTS[api_key] = (
+                OpenAI(api_key=api_key, max_retries=0),
+                AsyncOpenAI(api_key=api_key, max_retries=0),
+            )
+        return clients
+
+
+def close_shared_clients() -> None:
+    """
+    Closes the shared clients and stops the event loop (registered with atexit).
+    """
+    global _LOOP, _REQUEST_SLOTS
+    with _SHARED_LOCK:
+        clients = list(_SHARED_CLIENTS.values())
+        loop = _LOOP
+        _SHARED_CLIENTS.clear()
+        _LOOP = _REQUEST_SLOTS = None
+    for client, _aclient in clients:
+        client.close()
+    if loop is not None and loop.is_running():
+        for _client, aclient in clients:
+            try:
+                asyncio.run_coroutine_threadsafe(aclient.close(), loop).result(timeout=5)
+            except Exception:
+                pass
+        loop.call_soon_threadsafe(loop.stop)
+
+
+atexit.register(close_shared_clients)
+
+
+def validate_api_key(api_key: str) -> tuple[bool, str]:
+    """
+    Checks if an API key is valid by listing models, without building an
+    AIAgent (and opening its page cache).
+    The result is cached for the session, so later checks (or any key
+    that already completed a transcription) skip the network call.
+    Blocking: call it from a worker thread, not the GUI thread.
+    """
+    if api_key in _VALIDATED_KEYS:
+        return True, "API Key is valid."
+    try:
+        client, _aclient = _get_clients(api_key)
+        client.with_options(timeout=KEY_CHECK_TIMEOUT).models.list()
+        _VALIDATED_KEYS.add(api_key)
+        return True, "API Key is valid."
+    except Exception as e:
+        return False, str(e)
+
 class AIAgent:
-    def __init__(self, api_key: str, model_name: str = 'gpt-4o'):
+    def __init__(self, api_key: str, model_name: str = 'gpt-4o', cache: LLMCache = None, cache_policy: str = "enabled"):
+        """
+        cache_policy matches the result cache setting: "enabled" reads and
+        stores page responses, "read_only" never stores new ones and
+        "disabled" bypasses the page cache entirely (none is opened).
+        """
         self.api_key = api_key
-        self.client = OpenAI(api_key=self.api_key)
+        self.client, self.aclient = _get_clients(self.api_key)
         self.model_name = model_name
+        if cache_policy == "disabled":
+            self.cache = None
+        else:
+            self.cache = cache if cache is not None else LLMCache()
+        self.cache_read_only = cache_policy == "read_only"
+        # The instructions only differ for the first page (metadata block), so
+        # both variants are built once and reused byte-for-byte on every call.
+        self._prompt_cache = {True: self._build_prompt(with_metadata=True), False: self._build_prompt(with_metadata=False)}
+        # Routes every request of this model/prompt pair to the same OpenAI
+        # prompt-cache shard so the shared instruction prefix is reused.
+        self.prompt_cache_key = hashlib.sha256((self.model_name + self._prompt_cache[False]).encode()).hexdigest()[:32]
+
+    @property
+    def key_validated(self) -> bool:
+        return self.api_key in _VALIDATED_KEYS
 
-    def validate_key(self) -> bool:
+    def validate_key(self) -> tuple[bool, str]:
         """
-        Checks if the API key is valid by listing models.
+        Checks if the API key is valid; see validate_api_key.
         """
-        try:
-            self.client.models.list()
-            return True, "API Key is valid."
-        except Exception as e:
-            return False, str(e)
+        return validate_api_key(self.api_key)
 
-    def convert_page(self, image_bytes: bytes, page_num: int = 0) -> str:
+    def _prompt(self, page_num: int = 0) -> str:
         """
-        Sends a page image to OpenAI and gets the Markdown transcription.
+        Returns the prebuilt transcription instructions for a given page.
         """
-        try:
-            # Encode image to base64
-            base64_image = base64.b64encode(image_bytes).decode('utf-8')
-            
-            # Dynamic instructions based on page number
-            metadata_instruction = ""
-            if page_num == 0:
-                metadata_instruction = """
-            0. METADATA (YAML FRONTMATTER):
+        return self._prompt_cache[page_num == 0]
+
+    @staticmethod
+    def _build_prompt(with_metadata: bool = False) -> str:
+        """
+        Builds the transcription instructions.
+        """
+        # Only the first page asks for document metadata. It goes after the
+        # shared rules so every page's prompt starts with the same prefix.
+        metadata_instruction = ""
+        if with_metadata:
+            metadata_instruction = """
+            FIRST PAGE - METADATA (YAML FRONTMATTER):
                - Since this is the first page, analyze the content to extract metadata.
                - Output a YAML block at the VERY TOP of the response.
                - Fields: title, type (e.g., Manual, Standard, Paper), chapter (if applicable), tags (list of keywords).
@@ -44,12 +208,11 @@ class AIAgent:
                  ---
             """
 
-            prompt = f"""
+        return f"""
             You are an expert document digitizer. 
             Transcribe this document page into clean Markdown.
             
             Rules:
-            {metadata_instruction}
             1. CLEANING:
                - IGNORE page headers and footers (e.g., page numbers, repeated chapter titles, dates).
                - Do not transcribe them. Keep only the main content.
@@ -68,44 +231,203 @@ class AIAgent:
             6. Do not add any introductory or concluding remarks. Just the content.
             7. If the image is blank or unreadable, return an empty string.
             8. IMPORTANT: Do NOT wrap the output in a markdown code block (i.e., do NOT use ```markdown ... ```). Return raw markdown text.
+            {metadata_instruction}"""
+
+    def _build_batch_prompt(self, first_page_num: int, count: int) -> str:
+        """
+        Extends the page prompt with instructions for several images at once.
+        """
+        return self._prompt(first_page_num) + f"""
+            9. MULTIPLE PAGES:
+               - You will receive {count} page images in reading order.
+               - Apply all the rules above to each page independently.
+               - Start each page's transcription with a line containing only its marker: "=== PAGE 1 ===", "=== PAGE 2 ===", and so on up to "=== PAGE {count} ===".
+               - Always emit the marker, even if the page is blank. If metadata is requested, put it right after the "=== PAGE 1 ===" marker.
             """
-            
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
+
+    @staticmethod
+    def image_data_url(image_bytes: bytes) -> str:
+        """
+        Encodes PNG or JPEG bytes as a data URL (the MIME type is sniffed).
+        The prefix is joined at the bytes level so the payload is decoded to
+        str only once, instead of building an intermediate base64 string and
+        then copying it again into an f-string. pybase64 uses SIMD kernels,
+        which matters for multi-megabyte page images.
+        """
+        prefix = b"data:image/jpeg;base64," if image_bytes[:2] == b"\xff\xd8" else b"data:image/png;base64,"
+        return (prefix + b64encode(memoryview(image_bytes))).decode('ascii')
+
+    def _build_messages(self, image_bytes: bytes, page_num: int = 0, image_url: str = None) -> list[dict]:
+        """
+        Builds the chat messages payload for a single page image.
+        Pass a precomputed image_url to skip encoding on the request path.
+        """
+        if image_url is None:
+            image_url = self.image_data_url(image_bytes)
+        prompt = self._prompt(page_num)
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
                     {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{base64_image}"
-                                }
-                            }
-                        ]
+                        "type": "image_url",
+                        "image_url": {
+                            "url": image_url
+                        }
                     }
-                ],
+                ]
+            }
+        ]
+
+    def _build_batch_messages(self, images: list[bytes], first_page_num: int, image_urls: list[str] = None) -> list[dict]:
+        """
+        Builds a single chat message carrying several page images.
+        """
+        if image_urls is None:
+            image_urls = [self.image_data_url(img) for img in images]
+        content = [{"type": "text", "text": self._build_batch_prompt(first_page_num, len(images))}]
+        for url in image_urls:
+            content.append({"type": "image_url", "image_url": {"url": url}})
+        return [{"role": "user", "content": content}]
+
+    @classmethod
+    def _split_batch(cls, content: str, count: int) -> list[str] | None:
+        """
+        Splits a delimited multi-page response into per-page Markdown.
+        Returns None when the markers do not match the expected page count.
+        """
+        markers = list(_PAGE_MARKER_RE.finditer(content))
+        if [int(m.group(1)) for m in markers] != list(range(1, count + 1)):
+            return None
+        pages = []
+        for idx, marker in enumerate(markers):
+            end = markers[idx + 1].start() if idx + 1 < len(markers) else len(content)
+            pages.append(cls._postprocess(content[marker.end():end]))
+        return pages
+
+    @staticmethod
+    def _postprocess(content: str) -> str:
+        """
+        Cleans the raw model output into plain Markdown.
+        """
+        # Post-processing to remove potential markdown code blocks
+        content = _MD_FENCE_START.sub('', content, count=1)
+        content = _MD_FENCE_END.sub('', content, count=1)
+
+        # Post-processing: Fix LaTeX delimiters
+        # Replace \[ ... \] with $$ ... $$
+        content = _LATEX_BLOCK_RE.sub(r'$$\1$$', content)
+        # Replace \( ... \) with $ ... $
+        content = _LATEX_INLINE_RE.sub(r'$\1$', content)
+
+        return content.strip()
+
+    @staticmethod
+    def _estimate_tokens(messages: list[dict]) -> int:
+        """
+        Rough input-token count for rate limiting (~4 characters per token).
+        """
+        tokens = 0
+        for message in messages:
+            for part in message["content"]:
+                if part["type"] == "text":
+                    tokens += len(part["text"]) // 4
+                else:
+                    tokens += IMAGE_TOKEN_ESTIMATE
+        return tokens
+
+    async def _complete_async(self, **kwargs) -> str:
+        """
+        Streams a chat completion and returns the full text, retrying
+        transient errors (including ones raised mid-stream) with backoff;
+        waiting does not block other pages. A slot of the loop-wide request limit is held only while the request
+        streams, not during retry backoff.
+        """
+        tokens = self._estimate_tokens(kwargs["messages"])
+        for attempt in range(RETRY_ATTEMPTS):
+            try:
+                await rate_limiter().acquire_async(tokens)
+                async with _request_slots():
+                    stream = await self.aclient.chat.completions.create(stream=True, prompt_cache_key=self.prompt_cache_key, **kwargs)
+                    parts = []
+                    async for chunk in stream:
+                        if chunk.choices:
+                            parts.append(chunk.choices[0].delta.content or "")
+                _VALIDATED_KEYS.add(self.api_key)
+                return "".join(parts)
+            except RETRYABLE_ERRORS as e:
+                if attempt == RETRY_ATTEMPTS - 1:
+                    raise
+                await asyncio.sleep(_retry_delay(e, attempt))
+
+    def _cache_key(self, image_bytes: bytes, page_num: int = 0) -> str:
+        return make_key(image_bytes, self._prompt(page_num), self.model_name)
+
+    def _cache_get(self, key: str) -> str | None:
+        return self.cache.get(key) if self.cache is not None else None
+
+    def _cache_put(self, key: str, value: str) -> None:
+        if self.cache is not None and not self.cache_read_only:
+            self.cache.put(key, value, self.model_name)
+
+    def convert_page(self, image_bytes: bytes, page_num: int = 0, image_url: str = None) -> str:
+        """
+        Sends a page image to OpenAI and gets the Markdown transcription.
+        Blocking wrapper around convert_page_async for callers outside the
+        shared event loop.
+        """
+        return run_async(self.convert_page_async(image_bytes, page_num, image_url))
+
+    async def convert_page_async(self, image_bytes: bytes, page_num: int = 0, image_url: str = None) -> str:
+        """
+        Transcribes a page image; several pages can be in flight at once.
+        Responses are served from the on-disk cache when the same page was
+        already transcribed with the same prompt and model.
+        """
+        try:
+            key = self._cache_key(image_bytes, page_num)
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+
+            content = await self._complete_async(
+                model=self.model_name,
+                messages=self._build_messages(image_bytes, page_num, image_url),
                 max_tokens=4096
             )
-            
-            content = response.choices[0].message.content
-            
-            # Post-processing to remove potential markdown code blocks
-            if content.startswith("```markdown"):
-                content = content.replace("```markdown", "", 1)
-            elif content.startswith("```"):
-                content = content.replace("```", "", 1)
-                
-            if content.endswith("```"):
-                content = content[:-3]
-            
-            # Post-processing: Fix LaTeX delimiters
-            # Replace \[ ... \] with $$ ... $$
-            content = re.sub(r'\\\[(.*?)\\\]', r'$$\1$$', content, flags=re.DOTALL)
-            # Replace \( ... \) with $ ... $
-            content = re.sub(r'\\\((.*?)\\\)', r'$\1$', content, flags=re.DOTALL)
-                
-            return content.strip()
+            content = self._postprocess(content)
+            self._cache_put(key, content)
+            return content
         except Exception as e:
             return f"<!-- AI Error: {str(e)} -->"
+
+    async def convert_pages_batch_async(self, images: list[bytes], first_page_num: int = 0, image_urls: list[str] = None) -> list[str]:
+        """
+        Transcribes several consecutive pages with a single request so the
+        instruction prompt is only sent once. Falls back to one request per
+        page if the model does not return the expected page markers.
+        """
+        try:
+            key = make_key(b"".join(images), self._build_batch_prompt(first_page_num, len(images)), self.model_name)
+            cached = self._cache_get(key)
+            if cached is not None:
+                pages = self._split_batch(cached, len(images))
+                if pages is not None:
+                    return pages
+
+            content = await self._complete_async(
+                model=self.model_name,
+                messages=self._build_batch_messages(images, first_page_num, image_urls),
+                max_tokens=4096 * len(images)
+            )
+            pages = self._split_batch(content, len(images))
+            if pages is None:
+                return [
+                    await self.convert_page_async(img, first_page_num + i, image_urls[i] if image_urls else None)
+                    for i, img in enumerate(images)
+                ]
+            self._cache_put(key, content)
+            return pages
+        except Exception as e:
+            return [f"<!-- AI Error: {str(e)} -->"] * len(images)
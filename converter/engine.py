@@ -1,96 +1,299 @@
+import asyncio
+import io
+import os
 import pymupdf4llm
 import pathlib
 import fitz # PyMuPDF
-from converter.ai_agent import AIAgent
+from PIL import Image
+from converter.ai_agent import AIAgent, run_async
+from converter.llm_cache import LLMCache, make_result_key
 import re
+import threading
+import time
+
+# PyMuPDF does not support multithreaded use, and AI-mode conversions of a
+# batch run on parallel threads, so every use of it in a process is serialized.
+_FITZ_LOCK = threading.RLock()
 
 class PDFConverter:
-    def convert(self, pdf_path: str, output_path: str = None, progress_callback=None, ai_api_key: str = None, ai_model: str = 'gpt-4o') -> str:
+    def convert(self, pdf_path: str, output_path: str = None, progress_callback=None, ai_api_key: str = None, ai_model: str = 'gpt-4o', concurrency: int = 4, batch_size: int = 3, pdf_bytes: bytes = None, ai_agent: AIAgent = None, result_cache: LLMCache = None, cache_read_only: bool = False) -> str:
         """
         Converts a PDF file to Markdown.
-        If ai_api_key is provided, uses AI Agent for conversion.
+        If ai_api_key is provided, uses AI Agent for conversion, sending up to
+        `concurrency` requests of `batch_size` pages to OpenAI at the same time.
         Otherwise, uses pymupdf4llm.
+        If pdf_bytes is given, the PDF is parsed from memory and pdf_path is
+        only used to name the output and detect the start page.
+        A prebuilt ai_agent (e.g. one shared by a whole batch) takes precedence
+        over ai_api_key/ai_model.
+        With a result_cache, a PDF already converted with the same content,
+        mode, model and start page is restored from the cache without parsing;
+        new results are stored unless cache_read_only is set.
         """
         try:
-            doc = fitz.open(pdf_path)
-            total_pages = len(doc)
-            md_text = ""
-            
+            if progress_callback:
+                progress_callback = self._throttle_progress(progress_callback)
+
             # Try to detect start page from filename (e.g., "..._Start51.pdf")
             match = re.search(r"_Start(\d+)", pathlib.Path(pdf_path).stem)
             start_offset = int(match.group(1)) - 1 if match else 0
             
-            ai_agent = None
-            if ai_api_key:
+            if ai_agent is None and ai_api_key:
                 ai_agent = AIAgent(ai_api_key, model_name=ai_model)
             
-            for i in range(total_pages):
-                current_page_global = i + start_offset
-                
-                if ai_agent:
-                    # AI Mode: Get page as image
-                    page = doc.load_page(i)
-                    # Increase resolution (zoom x2) for better equation detection
-                    matrix = fitz.Matrix(2, 2)
-                    pix = page.get_pixmap(matrix=matrix)
-                    img_bytes = pix.tobytes("png")
-                    
-                    page_md = ai_agent.convert_page(img_bytes, page_num=current_page_global)
-                    md_text += f"## Page {current_page_global + 1}\n\n{page_md}\n\n"
-                else:
-                    # Local Mode
-                    page_md = pymupdf4llm.to_markdown(doc, pages=[i])
-                    md_text += page_md + "\n\n"
-                
-                if progress_callback:
-                    progress = int((i + 1) / total_pages * 100)
-                    progress_callback(progress)
-            
-            doc.close()
-            
             # Determine output path if not provided
             if output_path is None:
                 pdf_path_obj = pathlib.Path(pdf_path)
                 output_path = pdf_path_obj.with_suffix('.md')
+
+            result_key = None
+            if result_cache is not None:
+                result_key = make_result_key(
+                    pdf_bytes if pdf_bytes is not None else pdf_path,
+                    ai_agent.model_name if ai_agent else None,
+                    start_offset,
+                )
+                cached = result_cache.get(result_key)
+                if cached is not None:
+                    pathlib.Path(output_path).write_text(cached, encoding='utf-8')
+                    if progress_callback:
+                        progress_callback(100)
+                    return f"Success! Restored from cache to: {output_path}"
+
+            with _FITZ_LOCK:
+                doc = self._open_pdf(pdf_path, pdf_bytes)
+                total_pages = len(doc)
+                if ai_agent:
+                    # Rasterize up front so the lock is not held during the requests.
+                    try:
+                        images = self._render_pages(doc)
+                    finally:
+                        doc.close()
             
-            # Save the file
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(md_text)
+            # Pages are written as soon as every earlier page is on disk, so the
+            # full Markdown is never held in memory and a crash keeps the prefix.
+            # Only outputs small enough for the result cache are also kept.
+            cache_parts = [] if result_key is not None and not cache_read_only else None
+            cached_chars = 0
+            had_error = False
+            with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                pending = {}
+                next_to_write = 0
+
+                def write_page(i: int, text: str, failed: bool = False) -> None:
+                    nonlocal next_to_write, cache_parts, cached_chars, had_error
+                    had_error = had_error or failed
+                    pending[i] = text
+                    while next_to_write in pending:
+                        part = pending.pop(next_to_write)
+                        f.write(part)
+                        next_to_write += 1
+                        if cache_parts is not None:
+                            cached_chars += len(part)
+                            if cached_chars > self.RESULT_CACHE_MAX_CHARS:
+                                cache_parts = None
+                            else:
+                                cache_parts.append(part)
+
+                if ai_agent:
+                    # AI Mode: every page was rendered above; transcribe them concurrently
+                    run_async(
+                        self._convert_pages_async(
+                            images, ai_agent, start_offset, concurrency, progress_callback, batch_size,
+                            page_callback=lambda i, page_md: write_page(
+                                i, f"## Page {i + start_offset + 1}\n\n{page_md}\n\n", page_md.startswith("<!-- AI Error:")
+                            ),
+                        )
+                    )
+                else:
+                    # Page counts at which the integer percentage changes, so
+                    # progress is reported at most once per percent.
+                    report_at = {-(-total_pages * p // 100): p for p in range(1, 101)}
+                    with _FITZ_LOCK:
+                        try:
+                            for i in range(total_pages):
+                                # Local Mode
+                                page_md = pymupdf4llm.to_markdown(doc, pages=[i])
+                                write_page(i, page_md + "\n\n")
+
+                                if progress_callback and (i + 1) in report_at:
+                                    progress_callback(report_at[i + 1])
+                        finally:
+                            doc.close()
+
+                f.flush()
+                os.fsync(f.fileno())
+
+            # Documents with failed pages are retried next time, not replayed.
+            if cache_parts is not None and not had_error:
+                result_cache.put(result_key, "".join(cache_parts), ai_agent.model_name if ai_agent else "")
                 
             return f"Success! Saved to: {output_path}"
         except Exception as e:
             raise e
 
+    @staticmethod
+    def _throttle_progress(callback, min_interval: float = 1 / 30):
+        """
+        Wraps a progress callback so it fires at most ~30 times per second.
+        The final 100% update is always delivered.
+        """
+        last = [float("-inf")]
+
+        def emit(progress: int) -> None:
+            now = time.monotonic()
+            if progress >= 100 or now - last[0] >= min_interval:
+                last[0] = now
+                callback(progress)
+
+        return emit
+
+    # Outputs longer than this are written to disk but not kept in the result
+    # cache, so a huge conversion is never held in memory as a whole.
+    RESULT_CACHE_MAX_CHARS = 8_000_000
+
+    # Long edge, in pixels, of the images sent to OpenAI.
+    TARGET_LONG_EDGE = 1600
+    # Pages where a single color covers at least this share of pixels are
+    # treated as blank. At TARGET_LONG_EDGE this leaves ~18 stray pixels, less
+    # than a small page number, footnote mark or thin rule, which are kept.
+    BLANK_PAGE_RATIO = 0.99999
+    # Pages are sent as JPEG only when pictures dominate the rendering: the
+    # most common color (the paper) covers less than PHOTO_MAX_BACKGROUND of
+    # the pixels and there are more than PHOTO_MIN_COLORS distinct colors.
+    # Text with a small logo stays PNG, since JPEG blurs glyph edges.
+    PHOTO_MAX_BACKGROUND = 0.6
+    PHOTO_MIN_COLORS = 4096
+
+    @classmethod
+    def _render_page(cls, doc, i: int) -> bytes:
+        """
+        Rasterizes a single page for upload.
+        Pages are zoomed up to x2 (for equation detection) but capped at
+        TARGET_LONG_EDGE pixels. Photographic pages are sent as JPEG, which
+        is far smaller for them; text and line-art pages stay PNG to keep
+        glyph edges crisp.
+        Blank pages return b"" so they are never sent to OpenAI.
+        """
+        page = doc.load_page(i)
+        zoom = min(2.0, cls.TARGET_LONG_EDGE / max(page.rect.width, page.rect.height))
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        background = pix.color_topusage()[0]
+        if background >= cls.BLANK_PAGE_RATIO:
+            return b""
+        img = Image.frombuffer("RGB", (pix.width, pix.height), pix.samples, "raw", "RGB", pix.stride, 1)
+        if background < cls.PHOTO_MAX_BACKGROUND and img.getcolors(cls.PHOTO_MIN_COLORS) is None:
+            return pix.tobytes("jpeg", jpg_quality=85)
+        # PyMuPDF's PNG writer uses zlib's default level; level 1 encodes
+        # several times faster for a slightly larger upload.
+        buf = io.BytesIO()
+        img.save(buf, "PNG", compress_level=1, optimize=False)
+        return buf.getvalue()
+
+    @staticmethod
+    def _open_pdf(pdf_path: str, pdf_bytes: bytes = None) -> fitz.Document:
+        """Opens the PDF from memory when its bytes are available, else from disk."""
+        if pdf_bytes is not None:
+            return fitz.open(stream=pdf_bytes, filetype="pdf")
+        return fitz.open(pdf_path)
+
+    def _render_pages(self, doc: fitz.Document) -> list[bytes]:
+        """
+        Rasterizes all pages, one after another, and returns the image bytes
+        in page order.
+        PyMuPDF does not support multithreaded use, so pages are not rendered
+        on a thread pool.
+        """
+        return [self._render_page(doc, i) for i in range(len(doc))]
+
+    async def _convert_pages_async(self, images: list[bytes], ai_agent: AIAgent, start_offset: int = 0, concurrency: int = 4, progress_callback=None, batch_size: int = 1, page_callback=None) -> list[str]:
+        """
+        Transcribes page images concurrently, bounded by a semaphore.
+        Pages are grouped into requests of up to batch_size images; blank
+        pages (empty image bytes) resolve to "" without an API call.
+        Data URLs are only built for the requests in flight, on a worker
+        thread so encoding overlaps other pages' network I/O, and each entry
+        of images is released (set to None) once its page is transcribed.
+        page_callback(i, markdown) is called as each page completes, in
+        completion order. Returns the Markdown of each page in page order.
+        """
+        total_pages = len(images)
+        results = [""] * total_pages
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        batch_size = max(1, batch_size)
+        done = 0
+
+        def _finish(indices: list[int]) -> None:
+            nonlocal done
+            if page_callback:
+                for i in indices:
+                    page_callback(i, results[i])
+            done += len(indices)
+            if progress_callback:
+                progress_callback(int(done / total_pages * 100))
+
+        async def _convert(indices: list[int]) -> None:
+            async with semaphore:
+                batch_images = [images[i] for i in indices]
+                urls = await asyncio.to_thread(lambda: [AIAgent.image_data_url(img) for img in batch_images])
+                if len(indices) == 1:
+                    pages_md = [await ai_agent.convert_page_async(
+                        batch_images[0], page_num=indices[0] + start_offset, image_url=urls[0]
+                    )]
+                else:
+                    pages_md = await ai_agent.convert_pages_batch_async(
+                        batch_images, first_page_num=indices[0] + start_offset, image_urls=urls
+                    )
+            for i, page_md in zip(indices, pages_md):
+                results[i] = page_md
+                images[i] = None
+            _finish(indices)
+
+        blank = [i for i, img in enumerate(images) if not img]
+        if blank:
+            _finish(blank)
+        pending = [i for i, img in enumerate(images) if img]
+        await asyncio.gather(*(_convert(pending[k:k + batch_size]) for k in range(0, len(pending), batch_size)))
+        return results
+
     def split_pdf(self, pdf_path: str, pages_per_chunk: int = 50) -> list[str]:
         """
         Splits a PDF into chunks of specified pages.
         Returns a list of paths to the created chunks.
         """
         try:
-            doc = fitz.open(pdf_path)
-            total_pages = len(doc)
-            created_files = []
+            with _FITZ_LOCK:
+                doc = fitz.open(pdf_path)
+                total_pages = len(doc)
+                doc.close()
             
             pdf_path_obj = pathlib.Path(pdf_path)
             base_name = pdf_path_obj.stem
             parent_dir = pdf_path_obj.parent
             
+            created_files = []
             for i in range(0, total_pages, pages_per_chunk):
                 start_page = i
                 end_page = min(i + pages_per_chunk, total_pages)
-                
-                # Create new PDF for this chunk
-                new_doc = fitz.open()
-                new_doc.insert_pdf(doc, from_page=start_page, to_page=end_page - 1)
-                
                 chunk_name = f"{base_name}_Part{i//pages_per_chunk + 1}_Start{start_page + 1}.pdf"
-                chunk_path = parent_dir / chunk_name
-                
-                new_doc.save(chunk_path)
-                new_doc.close()
-                created_files.append(str(chunk_path))
-                
-            doc.close()
+                created_files.append(self._write_chunk(pdf_path, start_page, end_page, parent_dir / chunk_name))
             return created_files
         except Exception as e:
             raise e
+
+    @staticmethod
+    def _write_chunk(pdf_path: str, start_page: int, end_page: int, chunk_path) -> str:
+        """
+        Saves pages [start_page, end_page) of a PDF as a new file.
+        select() trims the document in place instead of copying pages into an
+        empty document with insert_pdf; garbage collection on save drops the
+        objects that only the removed pages referenced.
+        """
+        with _FITZ_LOCK:
+            new_doc = fitz.open(pdf_path)
+            try:
+                new_doc.select(list(range(start_page, end_page)))
+                new_doc.save(chunk_path, garbage=3, deflate=True, clean=True)
+            finally:
+                new_doc.close()
+        return str(chunk_path)
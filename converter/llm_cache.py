@@ -0,0 +1,93 @@
+import hashlib
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+# Bump when the transcription prompt changes so stale responses are not reused.
+PROMPT_VERSION = "v3"
+
+DEFAULT_CACHE_PATH = pathlib.Path.home() / ".pdftomd" / "llm_cache.sqlite3"
+DEFAULT_RESULT_CACHE_PATH = pathlib.Path.home() / ".pdftomd" / "result_cache.sqlite3"
+
+
+def make_key(image_bytes: bytes, prompt: str, model: str) -> str:
+    """
+    Builds the content-addressed key for a page transcription.
+    """
+    digest = hashlib.sha256()
+    digest.update(PROMPT_VERSION.encode())
+    digest.update(image_bytes)
+    digest.update(prompt.encode())
+    digest.update(model.encode())
+    return digest.hexdigest()
+
+
+def file_sha256(path, chunk_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of a file read in chunk_size blocks, so memory stays flat for large PDFs.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        if hasattr(os, "posix_fadvise"):
+            # Hint the kernel to read ahead for a single sequential pass.
+            os.posix_fadvise(handle.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while chunk := handle.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_result_key(pdf, model: str | None, start_offset: int = 0) -> str:
+    """
+    Builds the content-addressed key for a whole-document conversion.
+    pdf is either the PDF bytes or a path, which is hashed without loading
+    the whole file. model is None for local (pymupdf4llm) conversions.
+    """
+    if isinstance(pdf, (bytes, bytearray, memoryview)):
+        content_digest = hashlib.sha256(pdf).hexdigest()
+    else:
+        content_digest = file_sha256(pdf)
+    digest = hashlib.sha256()
+    digest.update(PROMPT_VERSION.encode())
+    digest.update(content_digest.encode())
+    digest.update((f"ai:{model}" if model else "local").encode())
+    digest.update(str(start_offset).encode())
+    return digest.hexdigest()
+
+
+class LLMCache:
+    """
+    On-disk cache of model responses keyed by SHA-256 of the request content.
+    """
+
+    def __init__(self, path=None):
+        self.path = pathlib.Path(path) if path else DEFAULT_CACHE_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache("
+                "key TEXT PRIMARY KEY, model TEXT, created REAL, response TEXT)"
+            )
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM cache WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, value: str, model: str = "") -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache(key, model, created, response) VALUES (?, ?, ?, ?)",
+                (key, model, time.time(), value),
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+# Local (pymupdf4llm) conversions are CPU-bound, so batches run them in
+# worker processes. Workers are spawned and only import this module and
+# converter.engine, never the Qt GUI; the engine import is deferred so the GUI
+# can import this module cheaply.
+
+# Per-process state for convert_local; each pool worker builds these once.
+_CONVERTER = None
+_RESULT_CACHE = None
+
+# GUI-process state: the pool and the manager that serves progress queues.
+_POOL_LOCK = threading.Lock()
+_POOL: ProcessPoolExecutor | None = None
+_MANAGER = None
+
+
+def convert_local(pdf_path: str, cache_policy: str = "enabled", progress_queue=None) -> str:
+    """
+    Entry point run in a worker process.
+    The converter and result cache are created on the first file a worker
+    handles and reused for the rest of the batch. Progress percentages are
+    put on progress_queue when one is given.
+    """
+    global _CONVERTER, _RESULT_CACHE
+    if _CONVERTER is None:
+        from converter.engine import PDFConverter
+
+        _CONVERTER = PDFConverter()
+    progress_callback = progress_queue.put if progress_queue is not None else None
+    if cache_policy == "disabled":
+        return _CONVERTER.convert(pdf_path, progress_callback=progress_callback)
+    if _RESULT_CACHE is None:
+        from converter.llm_cache import DEFAULT_RESULT_CACHE_PATH, LLMCache
+
+        _RESULT_CACHE = LLMCache(DEFAULT_RESULT_CACHE_PATH)
+    return _CONVERTER.convert(
+        pdf_path,
+        progress_callback=progress_callback,
+        result_cache=_RESULT_CACHE,
+        cache_read_only=cache_policy == "read_only",
+    )
+
+
+def submit(pdf_path: str, cache_policy: str = "enabled") -> tuple[Future, object]:
+    """
+    Queues a local conversion on the process pool (created on first use).
+    Returns the future and the queue the worker reports progress on.
+    """
+    global _POOL, _MANAGER
+    with _POOL_LOCK:
+        if _POOL is None:
+            # Spawn instead of fork: forking a process that runs Qt is unsafe.
+            context = multiprocessing.get_context("spawn")
+            _POOL = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=context)
+            _MANAGER = context.Manager()
+        progress_queue = _MANAGER.Queue()
+        return _POOL.submit(convert_local, pdf_path, cache_policy, progress_queue), progress_queue
+
+
+def shutdown() -> None:
+    """
+    Stops the pool without waiting for running conversions.
+    """
+    global _POOL, _MANAGER
+    with _POOL_LOCK:
+        pool, manager = _POOL, _MANAGER
+        _POOL = _MANAGER = None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+    if manager is not None:
+        manager.shutdown()
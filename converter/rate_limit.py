@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+
+# Defaults match OpenAI's tier-2 limits for gpt-4o; adjustable in Settings.
+DEFAULT_RPM = 500
+DEFAULT_TPM = 450_000
+
+
+class TokenBucket:
+    """
+    Client-side pacing for per-minute request (RPM) and token (TPM) limits.
+    Both buckets start full and refill continuously. A caller reserves its
+    share up front and the bucket may go into debt, so concurrent callers
+    queue up behind each other instead of all retrying after a 429.
+    A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM):
+        self._lock = threading.Lock()
+        self.rpm = self.tpm = None
+        self.configure(rpm, tpm)
+
+    def configure(self, rpm: int, tpm: int) -> None:
+        """
+        Sets new limits; a no-op (the current debt is kept) when they are unchanged.
+        """
+        rpm, tpm = max(0, int(rpm)), max(0, int(tpm))
+        with self._lock:
+            if (rpm, tpm) == (self.rpm, self.tpm):
+                return
+            self.rpm = rpm
+            self.tpm = tpm
+            self._requests = float(self.rpm)
+            self._tokens = float(self.tpm)
+            self._updated = time.monotonic()
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Takes capacity for one request of ~tokens tokens and returns the
+        number of seconds to wait before sending it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            wait = 0.0
+            if self.rpm:
+                self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60) - 1
+                if self._requests < 0:
+                    wait = -self._requests * 60 / self.rpm
+            if self.tpm:
+                # A single request larger than the whole budget waits one full window.
+                self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60) - min(tokens, self.tpm)
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens * 60 / self.tpm)
+            return wait
+
+    async def acquire_async(self, tokens: int) -> None:
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_RATE_LIMITER: TokenBucket | None = None
+_RATE_LIMITER_LOCK = threading.Lock()
+
+
+def rate_limiter() -> TokenBucket:
+    """
+    Process-wide bucket shared by every AIAgent.
+    """
+    global _RATE_LIMITER
+    with _RATE_LIMITER_LOCK:
+        if _RATE_LIMITER is None:
+            _RATE_LIMITER = TokenBucket()
+        return _RATE_LIMITER
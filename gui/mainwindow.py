@@ -14,18 +14,46 @@ from PySide6.QtWidgets import (
     QMessageBox,
     QProgressBar,
     QPushButton,
+    QSpinBox,
     QTabWidget,
     QVBoxLayout,
     QWidget,
     QInputDialog,
 )
-from PySide6.QtCore import Qt, QThread, Signal, QSettings
+from PySide6.QtCore import Qt, QElapsedTimer, QObject, QRunnable, QThreadPool, QTimer, Signal
 from PySide6.QtGui import QDragEnterEvent, QDropEvent, QAction, QKeySequence
-from converter.engine import PDFConverter
 import os
+from collections import deque
+from queue import Empty
+from typing import Final
 
-from converter.ai_agent import AIAgent
 from gui.notebook_tab import NotebookTab
+from converter import local_pool
+from converter.rate_limit import DEFAULT_RPM, DEFAULT_TPM
+from gui.settings import app_settings, load_api_key, save_api_key
+
+_PDF_SUFFIX: Final = ".pdf"
+# Stored value of the "result_cache_policy" setting -> label in the dialog.
+_CACHE_POLICIES: Final = (("enabled", "Enabled"), ("read_only", "Read-only"), ("disabled", "Disabled"))
+
+
+class KeyValidationSignals(QObject):
+    finished = Signal(bool, str)
+
+
+class KeyValidationWorker(QRunnable):
+    """Runs validate_api_key (a network call) off the GUI thread."""
+
+    def __init__(self, api_key):
+        super().__init__()
+        self.api_key = api_key
+        self.signals = KeyValidationSignals()
+
+    def run(self):
+        from converter.ai_agent import validate_api_key
+
+        ok, message = validate_api_key(self.api_key)
+        self.signals.finished.emit(ok, message)
 
 
 class SettingsDialog(QDialog):
@@ -34,20 +62,45 @@ class SettingsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Settings")
-        self.settings = getattr(parent, "settings", QSettings("MyCompany", "PDFtoMD"))
+        self.settings = app_settings()
 
         layout = QVBoxLayout(self)
 
         self.api_key_input = QLineEdit()
         self.api_key_input.setEchoMode(QLineEdit.PasswordEchoOnEdit)
         layout.addWidget(QLabel("OpenAI API Key"))
-        layout.addWidget(self.api_key_input)
+        key_row = QHBoxLayout()
+        key_row.addWidget(self.api_key_input, 1)
+        self.test_key_btn = QPushButton("Test Key")
+        self.test_key_btn.clicked.connect(self.test_key)
+        key_row.addWidget(self.test_key_btn)
+        layout.addLayout(key_row)
+        self.key_status_label = QLabel("")
+        layout.addWidget(self.key_status_label)
 
         self.model_combo = QComboBox()
         self.model_combo.addItems(["gpt-4o", "gpt-4o-mini", "gpt-3.5-turbo"])
         layout.addWidget(QLabel("Model"))
         layout.addWidget(self.model_combo)
 
+        layout.addWidget(QLabel("OpenAI rate limits (0 = unlimited)"))
+        limits_row = QHBoxLayout()
+        self.rpm_spin = QSpinBox()
+        self.rpm_spin.setRange(0, 1_000_000)
+        self.rpm_spin.setSuffix(" requests/min")
+        self.tpm_spin = QSpinBox()
+        self.tpm_spin.setRange(0, 100_000_000)
+        self.tpm_spin.setSingleStep(1000)
+        self.tpm_spin.setSuffix(" tokens/min")
+        limits_row.addWidget(self.rpm_spin)
+        limits_row.addWidget(self.tpm_spin)
+        layout.addLayout(limits_row)
+
+        layout.addWidget(QLabel("Files converted in parallel"))
+        self.worker_threads_spin = QSpinBox()
+        self.worker_threads_spin.setRange(1, 64)
+        layout.addWidget(self.worker_threads_spin)
+
         layout.addWidget(QLabel("MathJax source (for preview/export)"))
         mathjax_row = QHBoxLayout()
         self.mathjax_cdn_radio = QRadioButton("Use CDN (online)")
@@ -67,6 +120,17 @@ class SettingsDialog(QDialog):
         self.hide_logs_checkbox = QCheckBox("Hide log panel in exports")
         layout.addWidget(self.hide_logs_checkbox)
 
+        layout.addWidget(QLabel("Conversion result cache"))
+        cache_row = QHBoxLayout()
+        self.cache_policy_combo = QComboBox()
+        for value, label in _CACHE_POLICIES:
+            self.cache_policy_combo.addItem(label, value)
+        cache_row.addWidget(self.cache_policy_combo, 1)
+        clear_cache_btn = QPushButton("Clear cache")
+        clear_cache_btn.clicked.connect(self._clear_result_cache)
+        cache_row.addWidget(clear_cache_btn)
+        layout.addLayout(cache_row)
+
         self._load_render_settings()
 
         buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
@@ -77,9 +141,46 @@ class SettingsDialog(QDialog):
     def get_api_key(self):
         return self.api_key_input.text().strip()
 
+    def test_key(self):
+        """Validate the entered key on the thread pool so the dialog stays responsive."""
+        api_key = self.get_api_key()
+        if not api_key:
+            self.key_status_label.setText("Enter an API key first.")
+            return
+        self.test_key_btn.setEnabled(False)
+        self.key_status_label.setText("Checking key...")
+        self._key_worker = KeyValidationWorker(api_key)
+        self._key_worker.signals.finished.connect(self._on_key_validated)
+        QThreadPool.globalInstance().start(self._key_worker)
+
+    def _on_key_validated(self, ok, message):
+        self.test_key_btn.setEnabled(True)
+        self.key_status_label.setText(message if ok else f"Invalid key: {message}")
+
     def get_model(self):
         return self.model_combo.currentText()
 
+    def get_rate_limits(self):
+        return self.rpm_spin.value(), self.tpm_spin.value()
+
+    def get_worker_threads(self):
+        return self.worker_threads_spin.value()
+
+    def get_cache_policy(self):
+        return self.cache_policy_combo.currentData()
+
+    def _clear_result_cache(self):
+        """Clears both the whole-document results and the per-page AI responses."""
+        from converter.llm_cache import DEFAULT_CACHE_PATH, DEFAULT_RESULT_CACHE_PATH, LLMCache
+
+        for path in (DEFAULT_RESULT_CACHE_PATH, DEFAULT_CACHE_PATH):
+            cache = LLMCache(path)
+            try:
+                cache.clear()
+            finally:
+                cache.close()
+        QMessageBox.information(self, "Settings", "Conversion cache cleared.")
+
     def get_mathjax_mode(self):
         return "local" if self.mathjax_local_radio.isChecked() else "cdn"
 
@@ -92,14 +193,12 @@ class SettingsDialog(QDialog):
     def _load_render_settings(self):
         mode = self.settings.value("render/mathjax_mode", "cdn")
         path = self.settings.value("render/mathjax_path", "")
-        hide_logs = self.settings.value("render/hide_logs", False)
+        hide_logs = self.settings.bool_value("render/hide_logs")
 
         self.mathjax_cdn_radio.setChecked(mode != "local")
         self.mathjax_local_radio.setChecked(mode == "local")
         self.mathjax_path_input.setText(path)
-        if isinstance(hide_logs, str):
-            hide_logs = hide_logs.lower() in {"1", "true", "yes"}
-        self.hide_logs_checkbox.setChecked(bool(hide_logs))
+        self.hide_logs_checkbox.setChecked(hide_logs)
         self._update_mathjax_controls()
 
         self.mathjax_cdn_radio.toggled.connect(self._update_mathjax_controls)
@@ -120,39 +219,167 @@ class SettingsDialog(QDialog):
             self.mathjax_path_input.setText(path)
             self.mathjax_local_radio.setChecked(True)
 
-class ConversionWorker(QThread):
-    finished = Signal(str)
+
+class SplitSignals(QObject):
+    done = Signal(list)
     error = Signal(str)
-    progress = Signal(int)
 
-    def __init__(self, pdf_path, api_key=None, model_name='gpt-4o'):
+
+class SplitTask(QRunnable):
+    """Runs PDFConverter.split_pdf off the GUI thread."""
+
+    def __init__(self, converter, pdf_path, pages_per_chunk):
+        super().__init__()
+        self.converter = converter
+        self.pdf_path = pdf_path
+        self.pages_per_chunk = pages_per_chunk
+        self.signals = SplitSignals()
+
+    def run(self):
+        try:
+            chunks = self.converter.split_pdf(self.pdf_path, self.pages_per_chunk)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.done.emit(chunks)
+
+
+class ConversionSignals(QObject):
+    finished = Signal(int, str)
+    error = Signal(int, str)
+    progress = Signal(int, int)
+
+
+class ConversionWorker(QRunnable):
+    """Converts one PDF of the batch on the shared thread pool.
+
+    AI mode is network-bound and runs in the pool thread itself; local mode is
+    CPU-bound in pymupdf4llm, so it is handed to a process pool to sidestep the GIL.
+    """
+
+    # Every emit is a queued cross-thread event for the GUI thread, so progress
+    # only goes out when the percentage moves and at most every 50 ms.
+    PROGRESS_INTERVAL_MS = 50
+
+    def __init__(self, index, pdf_path, converter, api_key=None, model_name='gpt-4o', agent=None, result_cache=None, cache_policy="enabled"):
         super().__init__()
+        self.index = index
+        self.converter = converter
+        self.agent = agent
+        self.result_cache = result_cache
+        self.cache_policy = cache_policy
         self.pdf_path = pdf_path
         self.api_key = api_key
         self.model_name = model_name
-        self.converter = PDFConverter()
+        self.signals = ConversionSignals()
+        self._last_pct = -1
+        self._progress_timer = QElapsedTimer()
+
+    def _emit_progress(self, value):
+        if value < 100:
+            if value <= self._last_pct:
+                return
+            if self._progress_timer.isValid() and self._progress_timer.elapsed() < self.PROGRESS_INTERVAL_MS:
+                return
+        self._last_pct = value
+        self._progress_timer.start()
+        self.signals.progress.emit(self.index, value)
 
     def run(self):
         try:
-            result = self.converter.convert(self.pdf_path, progress_callback=self.progress.emit, ai_api_key=self.api_key, ai_model=self.model_name)
-            self.finished.emit(result)
+            if self.api_key:
+                # Read the file once; it is parsed from memory and hashed for the result cache.
+                with open(self.pdf_path, "rb") as f:
+                    pdf_bytes = f.read()
+                result = self.converter.convert(
+                    self.pdf_path, progress_callback=self._emit_progress, ai_api_key=self.api_key, ai_model=self.model_name, pdf_bytes=pdf_bytes, ai_agent=self.agent,
+                    result_cache=self.result_cache, cache_read_only=self.cache_policy == "read_only",
+                )
+            else:
+                future, progress = local_pool.submit(self.pdf_path, self.cache_policy)
+                while True:
+                    try:
+                        self._emit_progress(progress.get(timeout=0.1))
+                    except Empty:
+                        if future.done():
+                            break
+                result = future.result()
+                self._emit_progress(100)
+            self.signals.finished.emit(self.index, result)
         except Exception as e:
-            self.error.emit(str(e))
+            self.signals.error.emit(self.index, str(e))
 
 class MainWindow(QMainWindow):
+    SHUTDOWN_TIMEOUT_MS = 3000
+    # Queue/progress text updates are coalesced to one pass per ~60 Hz frame.
+    UI_REFRESH_MS = 16
+
+    _DROP_LABEL_QSS = """
+        QLabel {
+            border: 2px dashed #666;
+            border-radius: 10px;
+            padding: 20px;
+            font-size: 18px;
+            color: #ddd;
+            background-color: #333;
+        }
+        QLabel:hover {
+            border-color: #3498db;
+            background-color: #3d3d3d;
+        }
+    """
+    _START_BTN_QSS = """
+        QPushButton {
+            background-color: #27ae60;
+            color: white;
+            padding: 10px;
+            font-size: 16px;
+            border-radius: 5px;
+        }
+        QPushButton:disabled {
+            background-color: #555;
+            color: #aaa;
+        }
+        QPushButton:hover {
+            background-color: #2ecc71;
+        }
+    """
+    _QUIT_SEQ = QKeySequence.StandardKey.Quit
+    _PREFS_SEQ = QKeySequence("Ctrl+,")
+    _ABOUT_TEXT = "PDF to Markdown Converter + Notebook"
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("PDF to Markdown Converter")
         self.resize(600, 500)
         
         # Persistent Settings
-        self.settings = QSettings("MyCompany", "PDFtoMD")
-        self.api_key = self.settings.value("openai_api_key", "")
+        self.settings = app_settings()
+        self.api_key = load_api_key(self.settings)
         self.ai_model = self.settings.value("openai_model", "gpt-4o")
+        self.worker_threads = int(self.settings.value("worker_threads", os.cpu_count() or 1))
+        self.cache_policy = self.settings.value("result_cache_policy", "enabled")
+        self.rate_limits = (
+            int(self.settings.value("openai_rpm", DEFAULT_RPM)),
+            int(self.settings.value("openai_tpm", DEFAULT_TPM)),
+        )
         
-        self.file_queue = []
+        self.file_queue = deque()
+        # Canonical paths already in file_queue, so re-dropping a file is a no-op.
+        self._queued_paths: set[str] = set()
         self.total_files = 0
-        self.current_file_index = 0
+        self.completed_files = 0
+        self.file_progress = []
+        self.workers = []
+        self._batch_errors: list[tuple[str, str]] = []
+        self._split_task = None
+        self._converter = None
+        self._result_cache = None
+        self._ui_dirty = False
+
+        # Dedicated pool so conversions never starve other background tasks
+        # (e.g. key validation) queued on the global instance.
+        self.thread_pool = QThreadPool(self)
         
         self.tab_widget = QTabWidget()
         self.setCentralWidget(self.tab_widget)
@@ -185,20 +412,7 @@ class MainWindow(QMainWindow):
         # Drop Area
         self.label = QLabel("Drag & Drop PDF files here")
         self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.label.setStyleSheet("""
-            QLabel {
-                border: 2px dashed #666;
-                border-radius: 10px;
-                padding: 20px;
-                font-size: 18px;
-                color: #ddd;
-                background-color: #333;
-            }
-            QLabel:hover {
-                border-color: #3498db;
-                background-color: #3d3d3d;
-            }
-        """)
+        self.label.setStyleSheet(self._DROP_LABEL_QSS)
         self.pdf_layout.addWidget(self.label)
 
         # Queue Info
@@ -226,22 +440,7 @@ class MainWindow(QMainWindow):
         self.start_btn = QPushButton("Start Processing")
         self.start_btn.setEnabled(False)
         self.start_btn.clicked.connect(self.start_batch_processing)
-        self.start_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #27ae60;
-                color: white;
-                padding: 10px;
-                font-size: 16px;
-                border-radius: 5px;
-            }
-            QPushButton:disabled {
-                background-color: #555;
-                color: #aaa;
-            }
-            QPushButton:hover {
-                background-color: #2ecc71;
-            }
-        """)
+        self.start_btn.setStyleSheet(self._START_BTN_QSS)
         self.pdf_layout.addWidget(self.start_btn)
 
         # Progress Bar
@@ -260,35 +459,66 @@ class MainWindow(QMainWindow):
         # Enable drag and drop
         self.setAcceptDrops(True)
 
+    @property
+    def converter(self):
+        """Shared PDFConverter, created (and its heavy imports loaded) on first use.
+
+        PDFConverter keeps no per-call state, so one instance is shared by
+        every worker of every batch and by the split dialog.
+        """
+        if self._converter is None:
+            from converter.engine import PDFConverter
+
+            self._converter = PDFConverter()
+        return self._converter
+
+    @property
+    def result_cache(self):
+        """Shared cache of finished conversions, or None when caching is disabled."""
+        if self.cache_policy == "disabled":
+            return None
+        if self._result_cache is None:
+            from converter.llm_cache import DEFAULT_RESULT_CACHE_PATH, LLMCache
+
+            self._result_cache = LLMCache(DEFAULT_RESULT_CACHE_PATH)
+        return self._result_cache
+
     def _build_menu_bar(self):
         menu_bar = QMenuBar(self)
         self.setMenuBar(menu_bar)
 
         file_menu = menu_bar.addMenu("&File")
         exit_action = QAction("Exit", self)
-        exit_action.setShortcut(QKeySequence.StandardKey.Quit)
+        exit_action.setShortcut(self._QUIT_SEQ)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
 
         settings_menu = menu_bar.addMenu("&Settings")
         preferences_action = QAction("Preferences...", self)
-        preferences_action.setShortcut(QKeySequence("Ctrl+,"))
+        preferences_action.setShortcut(self._PREFS_SEQ)
         preferences_action.triggered.connect(self.open_settings)
         settings_menu.addAction(preferences_action)
 
         help_menu = menu_bar.addMenu("&Help")
         about_action = QAction("About", self)
-        about_action.triggered.connect(lambda: QMessageBox.information(self, "About", "PDF to Markdown Converter + Notebook"))
+        about_action.triggered.connect(lambda: QMessageBox.information(self, "About", self._ABOUT_TEXT))
         help_menu.addAction(about_action)
 
     def open_settings(self):
         dialog = SettingsDialog(self)
         dialog.api_key_input.setText(self.api_key)
         dialog.model_combo.setCurrentText(self.ai_model)
+        dialog.worker_threads_spin.setValue(self.worker_threads)
+        dialog.rpm_spin.setValue(self.rate_limits[0])
+        dialog.tpm_spin.setValue(self.rate_limits[1])
+        dialog.cache_policy_combo.setCurrentIndex(max(0, dialog.cache_policy_combo.findData(self.cache_policy)))
         
         if dialog.exec():
             new_key = dialog.get_api_key()
             new_model = dialog.get_model()
+            new_worker_threads = dialog.get_worker_threads()
+            new_rate_limits = dialog.get_rate_limits()
+            new_cache_policy = dialog.get_cache_policy()
             new_mathjax_mode = dialog.get_mathjax_mode()
             new_mathjax_path = dialog.get_mathjax_path()
             new_hide_logs = dialog.get_hide_logs()
@@ -296,7 +526,13 @@ class MainWindow(QMainWindow):
             changes = False
             if new_key != self.api_key:
                 self.api_key = new_key
-                self.settings.setValue("openai_api_key", self.api_key)
+                if not save_api_key(self.settings, self.api_key):
+                    QMessageBox.warning(
+                        self,
+                        "Keychain Unavailable",
+                        "No system keychain is available, so the API key was saved in the "
+                        "application settings as plain text.",
+                    )
                 changes = True
                 
             if new_model != self.ai_model:
@@ -304,24 +540,39 @@ class MainWindow(QMainWindow):
                 self.settings.setValue("openai_model", self.ai_model)
                 changes = True
 
-            prev_mode = self.settings.value("render/mathjax_mode", "cdn")
-            prev_path = self.settings.value("render/mathjax_path", "")
-            prev_hide_logs = self.settings.value("render/hide_logs", False)
-            prev_hide_logs_bool = (
-                prev_hide_logs.lower() in {"1", "true", "yes"} if isinstance(prev_hide_logs, str) else bool(prev_hide_logs)
-            )
-
-            if new_mathjax_mode != prev_mode:
-                self.settings.setValue("render/mathjax_mode", new_mathjax_mode)
+            if new_rate_limits != self.rate_limits:
+                self.rate_limits = new_rate_limits
+                self.settings.setValue("openai_rpm", new_rate_limits[0])
+                self.settings.setValue("openai_tpm", new_rate_limits[1])
                 changes = True
-            if new_mathjax_path != prev_path:
-                self.settings.setValue("render/mathjax_path", new_mathjax_path)
+
+            if new_worker_threads != self.worker_threads:
+                self.worker_threads = new_worker_threads
+                self.settings.setValue("worker_threads", self.worker_threads)
                 changes = True
-            if bool(new_hide_logs) != prev_hide_logs_bool:
-                self.settings.setValue("render/hide_logs", bool(new_hide_logs))
+
+            if new_cache_policy != self.cache_policy:
+                self.cache_policy = new_cache_policy
+                self.settings.setValue("result_cache_policy", self.cache_policy)
                 changes = True
-                
+
+            self.settings.beginGroup("render")
+            try:
+                if new_mathjax_mode != self.settings.value("mathjax_mode", "cdn"):
+                    self.settings.setValue("mathjax_mode", new_mathjax_mode)
+                    changes = True
+                if new_mathjax_path != self.settings.value("mathjax_path", ""):
+                    self.settings.setValue("mathjax_path", new_mathjax_path)
+                    changes = True
+                if bool(new_hide_logs) != self.settings.bool_value("hide_logs"):
+                    self.settings.setValue("hide_logs", bool(new_hide_logs))
+                    changes = True
+            finally:
+                self.settings.endGroup()
+
             if changes:
+                # One flush for the whole dialog instead of one per key.
+                self.settings.sync()
                 QMessageBox.information(self, "Settings", "Settings saved successfully.")
 
     def split_pdf_dialog(self):
@@ -330,13 +581,32 @@ class MainWindow(QMainWindow):
             return
             
         pages, ok = QInputDialog.getInt(self, "Split PDF", "Pages per chunk:", 50, 1, 1000)
-        if ok:
-            try:
-                converter = PDFConverter()
-                chunks = converter.split_pdf(file_path, pages)
-                QMessageBox.information(self, "Success", f"Created {len(chunks)} parts in the same folder.")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to split PDF:\n{str(e)}")
+        if not ok:
+            return
+
+        self.split_btn.setEnabled(False)
+        self.progress.setRange(0, 0)
+        self.progress.show()
+        self._split_task = SplitTask(self.converter, file_path, pages)
+        self._split_task.signals.done.connect(self._on_split_done)
+        self._split_task.signals.error.connect(self._on_split_error)
+        QThreadPool.globalInstance().start(self._split_task)
+
+    def _finish_split(self):
+        self._split_task = None
+        # A batch started meanwhile owns the progress bar and the Split button.
+        if not self.workers:
+            self.progress.setRange(0, 100)
+            self.progress.hide()
+            self.split_btn.setEnabled(True)
+
+    def _on_split_done(self, chunks):
+        self._finish_split()
+        QMessageBox.information(self, "Success", f"Created {len(chunks)} parts in the same folder.")
+
+    def _on_split_error(self, error_msg):
+        self._finish_split()
+        QMessageBox.critical(self, "Error", f"Failed to split PDF:\n{error_msg}")
 
     def dragEnterEvent(self, event: QDragEnterEvent):
         if event.mimeData().hasUrls():
@@ -345,16 +615,42 @@ class MainWindow(QMainWindow):
             event.ignore()
 
     def dropEvent(self, event: QDropEvent):
-        files = [u.toLocalFile() for u in event.mimeData().urls()]
-        pdf_files = [f for f in files if f.lower().endswith('.pdf')]
+        # Check only the short extension of each URL's file name before paying
+        # for the full local-path conversion.
+        pdf_files = [
+            u.toLocalFile()
+            for u in event.mimeData().urls()
+            if u.fileName().lower().endswith(_PDF_SUFFIX)
+        ]
         
-        if pdf_files:
-            self.file_queue.extend(pdf_files)
-            self.update_queue_ui()
-        else:
+        if not pdf_files:
             self.status_label.setText("Please drop PDF files")
+            return
+
+        skipped = 0
+        for pdf_file in pdf_files:
+            real_path = os.path.realpath(pdf_file)
+            if real_path in self._queued_paths or not os.path.isfile(real_path):
+                skipped += 1
+                continue
+            self._queued_paths.add(real_path)
+            self.file_queue.append(pdf_file)
+        if skipped:
+            self.status_label.setText(f"Skipped {skipped} duplicate or missing file(s)")
+        self.update_queue_ui()
             
     def update_queue_ui(self):
+        """Schedule one refresh of the queue and progress widgets for the next frame."""
+        if not self._ui_dirty:
+            self._ui_dirty = True
+            QTimer.singleShot(self.UI_REFRESH_MS, self._do_ui_refresh)
+
+    def _do_ui_refresh(self):
+        self._ui_dirty = False
+        if self.workers:
+            self.progress.setValue(int(sum(self.file_progress) / self.total_files))
+            self.status_label.setText(f"Processed {self.completed_files}/{self.total_files}")
+            return
         count = len(self.file_queue)
         self.queue_label.setText(f"Queue: {count} files ready")
         self.start_btn.setEnabled(count > 0)
@@ -362,7 +658,8 @@ class MainWindow(QMainWindow):
         self.clear_queue_btn.setEnabled(count > 0)
 
     def clear_queue(self):
-        self.file_queue = []
+        self.file_queue.clear()
+        self._queued_paths.clear()
         self.update_queue_ui()
         self.label.setText("Drag & Drop PDF files here")
         self.status_label.clear()
@@ -373,55 +670,108 @@ class MainWindow(QMainWindow):
     def start_batch_processing(self):
         if not self.file_queue:
             return
-            
+
+        use_ai = self.ai_checkbox.isChecked()
+        if use_ai and not self.api_key:
+            QMessageBox.warning(self, "Missing API Key", "Please enter your OpenAI API Key in Settings to use AI mode.")
+            return
+
         self.total_files = len(self.file_queue)
-        self.current_file_index = 0
+        self.completed_files = 0
+        self.file_progress = [0] * self.total_files
+        self._batch_errors = []
         self.start_btn.setEnabled(False)
         self.split_btn.setEnabled(False)
-        self.start_next_conversion()
+        self.clear_queue_btn.setEnabled(False)
+        self.setAcceptDrops(False)
 
-    def start_next_conversion(self):
-        if self.current_file_index < self.total_files:
-            file_path = self.file_queue[self.current_file_index]
-            self.start_conversion(file_path)
+        mode_text = "AI Agent" if use_ai else "Standard"
+        self.label.setText(f"Converting {self.total_files} files ({mode_text})...")
+        self.progress.setRange(0, 100)
+        self.progress.setValue(0)
+        self.progress.show()
+        self.status_label.setText(f"Processed 0/{self.total_files}")
+
+        api_key_to_use = self.api_key if use_ai else None
+        # One agent (prompt templates, response cache handle) for the whole batch.
+        agent = None
+        if use_ai:
+            from converter.ai_agent import AIAgent
+            from converter.rate_limit import rate_limiter
+
+            rate_limiter().configure(*self.rate_limits)
+            agent = AIAgent(self.api_key, model_name=self.ai_model, cache_policy=self.cache_policy)
+        self.thread_pool.setMaxThreadCount(max(1, min(self.total_files, self.worker_threads)))
+        self.workers = []
+        # Drain the queue into this batch; each worker keeps its own path.
+        for index in range(self.total_files):
+            file_path = self.file_queue.popleft()
+            worker = ConversionWorker(
+                index, file_path, self.converter, api_key=api_key_to_use, model_name=self.ai_model, agent=agent,
+                result_cache=self.result_cache if use_ai else None, cache_policy=self.cache_policy,
+            )
+            worker.signals.finished.connect(self.on_conversion_finished)
+            worker.signals.error.connect(self.on_conversion_error)
+            worker.signals.progress.connect(self.on_conversion_progress)
+            self.workers.append(worker)
+            self.thread_pool.start(worker)
+        self._queued_paths.clear()
+
+    def on_conversion_progress(self, index, value):
+        self.file_progress[index] = value
+        self.update_queue_ui()
+
+    def on_conversion_finished(self, index, message):
+        self.file_progress[index] = 100
+        self._on_file_done()
+
+    def on_conversion_error(self, index, error_msg):
+        # Reported together once the batch ends instead of one modal per file.
+        self._batch_errors.append((os.path.basename(self.workers[index].pdf_path), error_msg))
+        self.file_progress[index] = 100
+        self._on_file_done()
+
+    def _on_file_done(self):
+        self.completed_files += 1
+        if self.completed_files < self.total_files:
+            self.update_queue_ui()
+            return
+
+        failed = len(self._batch_errors)
+        if failed:
+            self.status_label.setText(f"Finished with {failed} failed file(s).")
         else:
             self.status_label.setText("All files processed successfully!")
-            self.label.setText("Drag & Drop PDF files here")
+        self.label.setText("Drag & Drop PDF files here")
+        self.setAcceptDrops(True)
+        self.workers = []
+        self.update_queue_ui()
+        if self._split_task is None:
             self.progress.hide()
-            self.setAcceptDrops(True)
-            self.file_queue = []
-            self.update_queue_ui()
             self.split_btn.setEnabled(True)
-            QMessageBox.information(self, "Batch Complete", f"Processed {self.total_files} files.")
+        else:
+            # Hand the bar back to the split that is still running.
+            self.progress.setRange(0, 0)
 
-    def start_conversion(self, file_path):
-        use_ai = self.ai_checkbox.isChecked()
-        if use_ai and not self.api_key:
-            QMessageBox.warning(self, "Missing API Key", "Please enter your OpenAI API Key in Settings to use AI mode.")
-            self.start_btn.setEnabled(True)
-            self.split_btn.setEnabled(True)
+        if not failed:
+            QMessageBox.information(self, "Batch Complete", f"Processed {self.total_files} files.")
             return
 
-        mode_text = "AI Agent" if use_ai else "Standard"
-        file_name = os.path.basename(file_path)
-        self.label.setText(f"Converting ({self.current_file_index + 1}/{self.total_files}): {file_name}...")
-        self.progress.setValue(0)
-        self.progress.show()
-        self.status_label.setText(f"Processing {file_name}...")
-        self.setAcceptDrops(False) 
-        
-        api_key_to_use = self.api_key if use_ai else None
-        self.worker = ConversionWorker(file_path, api_key=api_key_to_use, model_name=self.ai_model)
-        self.worker.finished.connect(self.on_conversion_finished)
-        self.worker.error.connect(self.on_conversion_error)
-        self.worker.progress.connect(self.progress.setValue)
-        self.worker.start()
-
-    def on_conversion_finished(self, message):
-        self.current_file_index += 1
-        self.start_next_conversion()
-
-    def on_conversion_error(self, error_msg):
-        QMessageBox.critical(self, "Error", f"Failed to convert file:\n{error_msg}")
-        self.current_file_index += 1
-        self.start_next_conversion()
+        msg = QMessageBox(self)
+        msg.setIcon(QMessageBox.Icon.Warning)
+        msg.setWindowTitle("Batch Complete")
+        msg.setText(f"Processed {self.total_files} files; {failed} failed to convert.")
+        msg.setDetailedText("\n\n".join(f"{name}:\n{error}" for name, error in self._batch_errors))
+        self._batch_errors = []
+        msg.exec()
+
+    def closeEvent(self, event):
+        # Drop conversions that have not started and give running ones a
+        # moment to finish before the window (and its signal hubs) go away.
+        self.thread_pool.clear()
+        self.thread_pool.waitForDone(self.SHUTDOWN_TIMEOUT_MS)
+        local_pool.shutdown()
+        if self._result_cache is not None:
+            self._result_cache.close()
+            self._result_cache = None
+        super().closeEvent(event)
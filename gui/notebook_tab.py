@@ -1,15 +1,18 @@
 """Notebook tab with SymPy-powered formula preview."""
 from __future__ import annotations
 
+import json
 import os
 import re
 
-from PySide6.QtCore import Qt, QSettings, QTimer
+from PySide6.QtCore import QObject, QRunnable, Qt, QStringListModel, QTemporaryDir, QThreadPool, QTimer, QUrl, Signal, Slot
 from PySide6.QtGui import (
     QKeySequence,
     QShortcut,
     QSyntaxHighlighter,
     QTextCharFormat,
+    QTextCursor,
+    QTextDocument,
     QColor,
     QFont,
 )
@@ -24,6 +27,7 @@ from PySide6.QtWidgets import (
     QMessageBox,
     QPushButton,
     QSplitter,
+    QStyledItemDelegate,
     QLabel,
     QTextEdit,
     QToolButton,
@@ -31,10 +35,147 @@ from PySide6.QtWidgets import (
     QWidget,
     QCheckBox,
 )
+from PySide6.QtWebChannel import QWebChannel
 from PySide6.QtWebEngineWidgets import QWebEngineView
 
-from notebook.document import Block, Document, FormulaBlock, NotebookOptions, TextBlock
-from notebook.renderer import NotebookRenderer
+from notebook.document import Block, Document, FormulaBlock, NotebookOptions, TextBlock, clear_expression_cache
+from notebook.renderer import MATHJAX_CDN_URL, NotebookRenderer
+from gui.settings import app_settings
+
+
+# Loaded once into the preview page: connects to PreviewBridge over QWebChannel
+# and applies block updates in place, re-typesetting only the new nodes.
+_PREVIEW_CHANNEL_JS = """
+<script src="qrc:///qtwebchannel/qwebchannel.js"></script>
+<script>
+// MathJax must not typeset concurrently: queue each pass behind the previous
+// one (and behind the initial page typeset) on MathJax.startup.promise.
+// Before the async MathJax script has loaded there is nothing to queue on;
+// its startup typeset will cover the nodes inserted by then.
+function typesetNodes(nodes) {
+  if (!nodes.length || !window.MathJax || !MathJax.startup || !MathJax.startup.promise) { return; }
+  MathJax.startup.promise = MathJax.startup.promise
+    .then(() => MathJax.typesetPromise(nodes))
+    .catch((err) => console.error(err));
+}
+function applyBlocks(payloadJson) {
+  const payload = JSON.parse(payloadJson);
+  const page = document.querySelector('.page');
+  if (!page) { return; }
+  const canClear = window.MathJax && MathJax.typesetClear;
+  const fresh = [];
+  const build = (id) => {
+    const html = payload.fragments[id];
+    const current = document.getElementById(id);
+    if (html === undefined) { return current; }
+    if (current && canClear) { MathJax.typesetClear([current]); }
+    const tpl = document.createElement('template');
+    tpl.innerHTML = html.trim();
+    const el = tpl.content.firstElementChild;
+    if (el) { fresh.push(el); }
+    return el;
+  };
+  const nodes = payload.order.map(build);
+  const summary = build('notebook-summary');
+  if (!payload.order.length) {
+    const empty = document.createElement('p');
+    empty.className = 'text-block';
+    empty.textContent = 'No blocks yet.';
+    nodes.push(empty);
+  }
+  nodes.push(summary);
+  page.replaceChildren(...nodes.filter(Boolean));
+  typesetNodes(fresh);
+}
+new QWebChannel(qt.webChannelTransport, (channel) => {
+  const bridge = channel.objects.bridge;
+  bridge.blocksChanged.connect(applyBlocks);
+  bridge.ready();
+});
+</script>
+"""
+
+
+class PreviewBridge(QObject):
+    """Object shared with the preview page through QWebChannel."""
+
+    blocksChanged = Signal(str)
+    pageReady = Signal()
+
+    @Slot()
+    def ready(self) -> None:
+        self.pageReady.emit()
+
+
+class ExportSignals(QObject):
+    finished = Signal(object, str)  # job, error message ("" on success)
+
+
+class ExportJob(QRunnable):
+    """Writes a notebook export off the GUI thread."""
+
+    def __init__(self, path: str, kind: str, write):
+        super().__init__()
+        self.path = path
+        self.kind = kind
+        self.write = write
+        self.signals = ExportSignals()
+
+    def run(self) -> None:
+        try:
+            self.write(self.path)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.signals.finished.emit(self, str(exc) or type(exc).__name__)
+            return
+        self.signals.finished.emit(self, "")
+
+
+class NumberedItemDelegate(QStyledItemDelegate):
+    """Paints list rows as "N. text", where N follows the row's current position.
+
+    Inserting or removing rows therefore never requires relabelling the rest.
+    """
+
+    def initStyleOption(self, option, index) -> None:
+        super().initStyleOption(option, index)
+        if option.text:
+            option.text = f"{index.row() + 1}. {option.text}"
+
+
+class RenderSignals(QObject):
+    finished = Signal(object)  # (blocks, summary) from render_parts, or the exception
+
+
+class RenderJob(QRunnable):
+    """Evaluates and renders a document snapshot off the GUI thread."""
+
+    def __init__(self, document: Document, renderer: NotebookRenderer, options: NotebookOptions):
+        super().__init__()
+        self.document = document
+        self.renderer = renderer
+        self.options = options
+        self.signals = RenderSignals()
+
+    def run(self) -> None:
+        try:
+            parts = self.renderer.render_parts(self.document, options=self.options)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.signals.finished.emit(exc)
+            return
+        self.signals.finished.emit(parts)
+
+
+_PAREN_RE = re.compile(r"[()]")
+# Implicit products the hint warns about: 3a, 3(, )3, )a and a(.
+_IMPLICIT_MUL_RE = re.compile(r"(\d)([A-Za-z])|(\d)\(|\)(\d)|\)([A-Za-z])|([A-Za-z])\(")
+
+
+def _expression_looks_complete(raw: str) -> bool:
+    """Cheap check that a formula is not obviously mid-typing."""
+
+    if raw.count("(") != raw.count(")"):
+        return False
+    return not raw.rstrip().endswith(("+", "-", "*", "/", "^", "=", ","))
 
 
 class ParenthesisHighlighter(QSyntaxHighlighter):
@@ -55,6 +196,11 @@ class ParenthesisHighlighter(QSyntaxHighlighter):
             QColor("#2980b9"),
             QColor("#f1c40f"),
         ]
+        self._formats = []
+        for color in self.palette:
+            fmt = QTextCharFormat()
+            fmt.setForeground(color)
+            self._formats.append(fmt)
 
     def highlightBlock(self, text: str) -> None:  # noqa: N802
         if not self.enabled:
@@ -62,19 +208,26 @@ class ParenthesisHighlighter(QSyntaxHighlighter):
 
         depth = self.previousBlockState()
         depth = 0 if depth < 0 else depth
-        fmt = QTextCharFormat()
-
-        for i, ch in enumerate(text):
-            if ch == "(":
-                color = self.palette[depth % len(self.palette)]
-                fmt.setForeground(color)
-                self.setFormat(i, 1, fmt)
+        count = len(self._formats)
+        # Visit only the parentheses and coalesce adjacent same-colour ones
+        # (e.g. ")(") into a single setFormat call.
+        run_start = run_end = run_color = -1
+        for match in _PAREN_RE.finditer(text):
+            i = match.start()
+            if text[i] == "(":
+                color = depth % count
                 depth += 1
-            elif ch == ")":
+            else:
                 depth = max(depth - 1, 0)
-                color = self.palette[depth % len(self.palette)]
-                fmt.setForeground(color)
-                self.setFormat(i, 1, fmt)
+                color = depth % count
+            if i == run_end and color == run_color:
+                run_end += 1
+                continue
+            if run_start >= 0:
+                self.setFormat(run_start, run_end - run_start, self._formats[run_color])
+            run_start, run_end, run_color = i, i + 1, color
+        if run_start >= 0:
+            self.setFormat(run_start, run_end - run_start, self._formats[run_color])
 
         self.setCurrentBlockState(depth)
 
@@ -82,22 +235,141 @@ class ParenthesisHighlighter(QSyntaxHighlighter):
 class NotebookTab(QWidget):
     """Simple calculation notebook UI with block list, editor, and preview."""
 
+    # Typing pause before the document is re-evaluated and the preview redrawn.
+    EDIT_DEBOUNCE_MS = 250
+    # Past these sizes (in characters) parenthesis colouring is turned off for
+    # the block and typing waits longer before re-rendering the whole notebook.
+    LARGE_BLOCK_CHARS = 200_000
+    LARGE_DOCUMENT_CHARS = 1_000_000
+    LARGE_DEBOUNCE_MS = 1000
+    # Longer pause for a formula that is still being typed ("sin(", "a +"),
+    # so its parse error is not rendered between keystrokes.
+    INCOMPLETE_DEBOUNCE_MS = 1000
+
+    # Snippet toolbar: (group title, ((button label, inserted text), ...)).
+    TOOLBAR_SNIPPETS: tuple[tuple[str, tuple[tuple[str, str], ...]], ...] = (
+        ("Operadores", (
+            ("+", " + "),
+            ("-", " - "),
+            ("*", " * "),
+            ("/", " / "),
+            ("^", " ** "),
+            ("sqrt", "sqrt()"),
+            ("\u22c5", " \u22c5 "),
+            ("\u2248", " \u2248 "),
+        )),
+        ("Funciones", (
+            ("sin", "sin()"),
+            ("cos", "cos()"),
+            ("tan", "tan()"),
+            ("exp", "exp()"),
+            ("log", "log()"),
+            ("pi", "pi"),
+            ("abs", "abs()"),
+        )),
+        ("Agregados", (
+            ("sum", "sum()"),
+            ("min", "min()"),
+            ("max", "max()"),
+            ("range", "range()"),
+        )),
+        ("Arrays", (
+            ("linspace", "linspace( , , )"),
+            ("arange", "arange( , , )"),
+            ("sweep", "sweep(f, xs)"),
+        )),
+        ("Condicionales", (
+            ("if/else", "(a) if (condicion) else (b)"),
+            ("if/elif/else", "(a) if (cond1) else ((b) if (cond2) else (c))"),
+        )),
+        ("Lógico", (
+            ("A and B", "(A) and (B)"),
+            ("A or B", "(A) or (B)"),
+            ("not A", "not (A)"),
+        )),
+        ("Definir f(x)", (
+            ("f(x)", "f(x) = "),
+        )),
+        ("LaTeX", (
+            ("Inline $", r"$ $"),
+            ("Frac", r"\frac{}{}"),
+            ("Sqrt", r"\sqrt{}"),
+            ("Sub", r"x_{}"),
+            ("Sup", r"x^{}"),
+        )),
+    )
+
+    GREEK_SYMBOLS: tuple[str, ...] = (
+        r"\alpha", r"\beta", r"\gamma", r"\delta", r"\phi",
+        r"\theta", r"\lambda", r"\pi", r"\sigma", r"\omega",
+    )
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.document = Document()
         self.renderer = NotebookRenderer()
         self.paren_highlighter = None
 
-        self.settings = getattr(parent, "settings", QSettings("MyCompany", "PDFtoMD"))
+        self.settings = app_settings()
 
         # UI elements
         self.block_list = QListWidget()
         self.block_stack = QListWidget()
         self.editor = QTextEdit()
-        self.preview = QWebEngineView()
-        self._delete_armed = False
+        # The web view (and its Chromium process) is created on first show;
+        # renders until then only update the stored fragments.
+        self.preview: QWebEngineView | None = None
+        self._preview_host = QWidget()
+        # Running while a first "D" press waits for the second one.
+        self._delete_arm_timer = QTimer(self)
+        self._delete_arm_timer.setSingleShot(True)
+        self._delete_arm_timer.setInterval(600)
         self.hint_label = QLabel()
         self._last_selected_block_id = None
+        self._pending_block: Block | None = None
+        # Total length of every block's text; edits adjust it, structural
+        # changes recount it.
+        self._document_chars = 0
+        self._edit_timer = QTimer(self)
+        self._edit_timer.setSingleShot(True)
+        self._edit_timer.setInterval(self.EDIT_DEBOUNCE_MS)
+        self._edit_timer.timeout.connect(self._apply_editor_changes)
+        # Restarted on every selection change, so only the last one scrolls.
+        self._scroll_timer = QTimer(self)
+        self._scroll_timer.setSingleShot(True)
+        self._scroll_timer.setInterval(150)
+        self._scroll_timer.timeout.connect(self._scroll_preview)
+        # The preview page is loaded once per MathJax source; later renders are
+        # pushed as fragment deltas over the web channel.
+        self._preview_shell: tuple[str | None, str | None] | None = None
+        self._preview_fragments: dict[str, str] = {}
+        self._preview_order: list[str] = []
+        self._page_fragments: dict[str, str] = {}
+        self._page_order: list[str] = []
+        self._preview_loaded = False
+        # Background exports in flight, kept alive until they report back.
+        self._export_jobs: list[ExportJob] = []
+        # Preview renders run one at a time on their own pool.
+        self._render_pool = QThreadPool(self)
+        self._render_pool.setMaxThreadCount(1)
+        self._render_job: RenderJob | None = None
+        self._render_running = False
+        self._render_stale = False
+        # Block ids, kinds and sources of the render in flight / last shown;
+        # the render is skipped when nothing that feeds evaluation changed.
+        self._render_key: tuple | None = None
+        self._shown_key: tuple | None = None
+        self.preview_bridge = PreviewBridge(self)
+        self.preview_bridge.pageReady.connect(self._on_preview_ready)
+        self._preview_channel: QWebChannel | None = None
+        self._preview_dir: QTemporaryDir | None = None
+        # block_id -> (title, block list label without the row number); both are
+        # fixed for a block's lifetime, only the leading row number changes.
+        self._block_titles: dict[str, tuple[str, str]] = {}
+        # One editor document per block id, so switching blocks swaps documents
+        # instead of re-laying out the text; the blank one backs an empty notebook.
+        self._editor_docs: dict[str, tuple[QTextDocument, ParenthesisHighlighter]] = {}
+        self._blank_doc = QTextDocument(self)
 
         self._setup_ui()
         self._connect_signals()
@@ -137,9 +409,9 @@ class NotebookTab(QWidget):
         delete_btn.clicked.connect(self.delete_selected_block)
 
         move_up_btn = QPushButton("Move\nUp")
-        move_up_btn.clicked.connect(lambda: self.move_selected_block(-1))
+        move_up_btn.clicked.connect(self._move_block_up)
         move_down_btn = QPushButton("Move\nDown")
-        move_down_btn.clicked.connect(lambda: self.move_selected_block(1))
+        move_down_btn.clicked.connect(self._move_block_down)
 
         undo_btn = QPushButton("Undo")
         undo_btn.clicked.connect(self.undo_action)
@@ -167,6 +439,14 @@ class NotebookTab(QWidget):
         left_layout.setContentsMargins(0, 0, 0, 0)
         left_layout.setSpacing(6)
 
+        # Every row is a single line of text, so Qt can size one item and lay
+        # out the rest in batches instead of measuring each row.
+        for block_view in (self.block_list, self.block_stack):
+            block_view.setUniformItemSizes(True)
+            block_view.setLayoutMode(QListWidget.LayoutMode.Batched)
+            block_view.setBatchSize(64)
+            block_view.setItemDelegate(NumberedItemDelegate(block_view))
+
         block_list_label = QLabel("Blocks (id/type)")
         left_layout.addWidget(block_list_label)
         left_layout.addWidget(self.block_list, 1)
@@ -184,7 +464,8 @@ class NotebookTab(QWidget):
         font.setBold(True)
         self.editor.setFont(font)
         left_layout.addWidget(self.editor, 1)
-        self.paren_highlighter = ParenthesisHighlighter(self.editor.document())
+        self._blank_doc.setDefaultFont(font)
+        self.editor.setDocument(self._blank_doc)
         self.hint_label.setStyleSheet("color: #f7c6c5; font-size: 11px;")
         left_layout.addWidget(self.hint_label)
 
@@ -200,14 +481,22 @@ class NotebookTab(QWidget):
         preview_label = QLabel("Preview")
         preview_label.setStyleSheet("font-weight: bold;")
         center_layout.addWidget(preview_label)
-        center_layout.addWidget(self.preview, 1)
+        preview_host_layout = QVBoxLayout(self._preview_host)
+        preview_host_layout.setContentsMargins(0, 0, 0, 0)
+        center_layout.addWidget(self._preview_host, 1)
 
         # Right column: toolbar
         right_panel = QWidget()
         right_layout = QVBoxLayout(right_panel)
         right_layout.setContentsMargins(6, 6, 6, 6)
         right_layout.setSpacing(6)
-        right_layout.addWidget(self._build_toolbar())
+        # The snippet toolbar is built on first show (see showEvent); the host
+        # reserves its width so the splitter layout does not jump.
+        self._toolbar_host = QWidget()
+        self._toolbar_host.setMinimumWidth(220)
+        toolbar_host_layout = QVBoxLayout(self._toolbar_host)
+        toolbar_host_layout.setContentsMargins(0, 0, 0, 0)
+        right_layout.addWidget(self._toolbar_host)
         right_layout.addStretch()
 
         splitter.addWidget(left_panel)
@@ -225,22 +514,25 @@ class NotebookTab(QWidget):
         self.editor.textChanged.connect(self.on_editor_changed)
 
     def _setup_shortcuts(self) -> None:
-        QShortcut(QKeySequence("Ctrl+Up"), self, activated=lambda: self.move_selected_block(-1))
-        QShortcut(QKeySequence("Ctrl+Down"), self, activated=lambda: self.move_selected_block(1))
-        QShortcut(QKeySequence.StandardKey.Undo, self, activated=self.undo_action)
-        QShortcut(QKeySequence.StandardKey.Redo, self, activated=self.redo_action)
-        QShortcut(QKeySequence("A"), self.block_stack, activated=lambda: self._insert_block_keyboard(above=True))
-        QShortcut(QKeySequence("B"), self.block_stack, activated=lambda: self._insert_block_keyboard(above=False))
-        QShortcut(QKeySequence("T"), self.block_stack, activated=lambda: self._insert_block_keyboard(above=False, force_type="text"))
-        QShortcut(QKeySequence("F"), self.block_stack, activated=lambda: self._insert_block_keyboard(above=False, force_type="formula"))
-        QShortcut(QKeySequence("Shift+Return"), self.editor, activated=self._evaluate_and_advance)
-        QShortcut(QKeySequence("D"), self.block_stack, activated=self._handle_delete_shortcut)
+        shortcuts = (
+            ("Ctrl+Up", self, self._move_block_up),
+            ("Ctrl+Down", self, self._move_block_down),
+            (QKeySequence.StandardKey.Undo, self, self.undo_action),
+            (QKeySequence.StandardKey.Redo, self, self.redo_action),
+            ("A", self.block_stack, self._insert_block_above),
+            ("B", self.block_stack, self._insert_block_below),
+            ("T", self.block_stack, self._insert_text_block_below),
+            ("F", self.block_stack, self._insert_formula_block_below),
+            ("Shift+Return", self.editor, self._evaluate_and_advance),
+            ("D", self.block_stack, self._handle_delete_shortcut),
+        )
+        for sequence, target, slot in shortcuts:
+            QShortcut(QKeySequence(sequence), target, activated=slot)
 
     def _seed_document(self) -> None:
         """Add a starter text and formula block so the preview is not empty."""
         intro = TextBlock("Start adding notes and formulas for your calculations.")
         example = FormulaBlock("2 * (3 + 5)")
-        example.evaluate()
         self.document.add_block(intro)
         self.document.add_block(example)
         self._refresh_block_views()
@@ -250,21 +542,25 @@ class NotebookTab(QWidget):
     def add_text_block(self) -> None:
         block = TextBlock("New text block")
         self.document.add_block(block)
-        self._refresh_block_views(select_last=True)
+        self._insert_block_item(len(self.document.blocks) - 1)
+        self._activate_row(len(self.document.blocks) - 1)
         self.update_preview()
 
     def add_formula_block(self) -> None:
+        # Evaluated with the rest of the document by update_preview().
         block = FormulaBlock("a + b")
-        block.evaluate()
         self.document.add_block(block)
-        self._refresh_block_views(select_last=True)
+        self._insert_block_item(len(self.document.blocks) - 1)
+        self._activate_row(len(self.document.blocks) - 1)
         self.update_preview()
 
     def delete_selected_block(self) -> None:
         current_row = self._current_row()
         if 0 <= current_row < len(self.document.blocks):
             self.document.delete_block(current_row)
-            self._refresh_block_views(select_row=max(0, current_row - 1))
+            self._remove_block_item(current_row)
+            self._prune_editor_docs()
+            self._activate_row(max(0, current_row - 1))
             self.update_preview()
 
     def move_selected_block(self, direction: int) -> None:
@@ -273,28 +569,49 @@ class NotebookTab(QWidget):
             return
         target_row = current_row + direction
         if self.document.move_block(current_row, target_row):
-            self._refresh_block_views(select_row=target_row)
+            self._swap_block_items(current_row, target_row)
+            self._activate_row(target_row)
             self.update_preview()
 
     def undo_action(self) -> None:
         if self.document.undo():
             target = min(self._current_row(), len(self.document.blocks) - 1)
-            self._refresh_block_views(select_row=target)
+            self._sync_block_items()
+            self._prune_editor_docs()
+            self._activate_row(target)
             self.update_preview()
 
     def redo_action(self) -> None:
         if self.document.redo():
             target = min(self._current_row(), len(self.document.blocks) - 1)
-            self._refresh_block_views(select_row=target)
+            self._sync_block_items()
+            self._prune_editor_docs()
+            self._activate_row(target)
             self.update_preview()
 
     def _new_block(self, block_type: str) -> Block:
         if block_type == "formula":
-            block = FormulaBlock("a + b")
-            block.evaluate()
-            return block
+            return FormulaBlock("a + b")
         return TextBlock("New text block")
 
+    def _move_block_up(self) -> None:
+        self.move_selected_block(-1)
+
+    def _move_block_down(self) -> None:
+        self.move_selected_block(1)
+
+    def _insert_block_above(self) -> None:
+        self._insert_block_keyboard(above=True)
+
+    def _insert_block_below(self) -> None:
+        self._insert_block_keyboard(above=False)
+
+    def _insert_text_block_below(self) -> None:
+        self._insert_block_keyboard(above=False, force_type="text")
+
+    def _insert_formula_block_below(self) -> None:
+        self._insert_block_keyboard(above=False, force_type="formula")
+
     def _insert_block_keyboard(self, above: bool, force_type: str | None = None) -> None:
         """Insert a block relative to the active one, inspired by Jupyter A/B shortcuts."""
 
@@ -302,7 +619,8 @@ class NotebookTab(QWidget):
             base_type = force_type or "text"
             block = self._new_block(base_type)
             self.document.add_block(block)
-            self._refresh_block_views(select_last=True)
+            self._insert_block_item(0)
+            self._activate_row(0)
             self.update_preview()
             self._focus_stack()
             return
@@ -312,13 +630,14 @@ class NotebookTab(QWidget):
             current_row = len(self.document.blocks) - 1
 
         active_block = self.document.blocks[current_row]
-        base_type = "formula" if isinstance(active_block, FormulaBlock) else "text"
+        base_type = active_block.kind
         block_type = force_type or base_type
         insert_at = current_row if above else current_row + 1
 
         block = self._new_block(block_type)
         if self.document.insert_block(insert_at, block):
-            self._refresh_block_views(select_row=insert_at)
+            self._insert_block_item(insert_at)
+            self._activate_row(insert_at)
             self.update_preview()
             self._focus_stack()
 
@@ -326,6 +645,7 @@ class NotebookTab(QWidget):
         """Evaluate current block and move to the next one (creating if needed)."""
 
         self.on_editor_changed()
+        self._apply_editor_changes()
         current_row = self._current_row()
         if current_row < 0:
             return
@@ -340,12 +660,11 @@ class NotebookTab(QWidget):
     def _handle_delete_shortcut(self) -> None:
         """Double-tap D to delete the active block without using the mouse."""
 
-        if self._delete_armed:
-            self._delete_armed = False
+        if self._delete_arm_timer.isActive():
+            self._delete_arm_timer.stop()
             self.delete_selected_block()
             return
-        self._delete_armed = True
-        QTimer.singleShot(600, lambda: setattr(self, "_delete_armed", False))
+        self._delete_arm_timer.start()
 
     def save_document(self) -> None:
         path, _ = QFileDialog.getSaveFileName(
@@ -367,6 +686,9 @@ class NotebookTab(QWidget):
         try:
             self.document = Document.load(path)
             self.renderer = NotebookRenderer()
+            self._block_titles.clear()
+            self._prune_editor_docs()
+            clear_expression_cache()
             self._refresh_block_views()
             self.update_preview()
         except Exception as exc:  # pylint: disable=broad-except
@@ -374,36 +696,100 @@ class NotebookTab(QWidget):
 
     # UI updates
     def _refresh_block_views(self, select_last: bool = False, select_row: int | None = None) -> None:
-        self.block_list.clear()
-        self.block_stack.clear()
-        for idx, block in enumerate(self.document.blocks):
-            title = "Text" if isinstance(block, TextBlock) else "Formula"
-            item = QListWidgetItem(f"{idx + 1}. {title} [{block.block_id[:6]}]")
-            self.block_list.addItem(item)
-
-            summary = block.raw.strip().splitlines()[0] if block.raw.strip() else "(empty)"
-            if len(summary) > 60:
-                summary = summary[:57] + "..."
-            stack_label = f"{idx + 1}. {title}: {summary}"
-            stack_item = QListWidgetItem(stack_label)
-            stack_item.setToolTip(block.raw.strip() or title)
-            self.block_stack.addItem(stack_item)
+        """Rebuild both lists from scratch; only used when the whole document is replaced."""
+
+        self._recount_document_chars()
+        lists = (self.block_list, self.block_stack)
+        for widget in lists:
+            widget.setUpdatesEnabled(False)
+            widget.blockSignals(True)
+        try:
+            self.block_list.clear()
+            self.block_stack.clear()
+            for row in range(len(self.document.blocks)):
+                list_label, stack_label, tooltip = self._block_labels(row)
+                self.block_list.addItem(QListWidgetItem(list_label))
+                stack_item = QListWidgetItem(stack_label)
+                stack_item.setToolTip(tooltip)
+                self.block_stack.addItem(stack_item)
+        finally:
+            for widget in lists:
+                widget.blockSignals(False)
+                widget.setUpdatesEnabled(True)
+
+        if select_last:
+            target_row = len(self.document.blocks) - 1
+        elif select_row is not None:
+            target_row = select_row
+        else:
+            target_row = 0
+        self._activate_row(target_row)
+
+    def _insert_block_item(self, row: int) -> None:
+        """Add list rows for a block inserted at ``row``; the delegate renumbers later rows."""
+
+        self._recount_document_chars()
+        self.block_list.blockSignals(True)
+        self.block_stack.blockSignals(True)
+        self.block_list.insertItem(row, QListWidgetItem())
+        self.block_stack.insertItem(row, QListWidgetItem())
+        self.block_list.blockSignals(False)
+        self.block_stack.blockSignals(False)
+        self._update_stack_item(row)
+
+    def _remove_block_item(self, row: int) -> None:
+        """Drop the list rows of a deleted block; the delegate renumbers later rows."""
+
+        self._recount_document_chars()
+        self.block_list.blockSignals(True)
+        self.block_stack.blockSignals(True)
+        self.block_list.takeItem(row)
+        self.block_stack.takeItem(row)
+        self.block_list.blockSignals(False)
+        self.block_stack.blockSignals(False)
+
+    def _swap_block_items(self, first: int, second: int) -> None:
+        """Relabel the two rows exchanged by a move; the items themselves are reused."""
+
+        self._update_stack_item(first)
+        self._update_stack_item(second)
+
+    def _sync_block_items(self) -> None:
+        """Match the list rows to a restored snapshot, reusing existing items."""
+
+        self._recount_document_chars()
+        count = len(self.document.blocks)
+        lists = (self.block_list, self.block_stack)
+        for widget in lists:
+            widget.setUpdatesEnabled(False)
+            widget.blockSignals(True)
+        try:
+            while self.block_list.count() > count:
+                self.block_list.takeItem(self.block_list.count() - 1)
+                self.block_stack.takeItem(self.block_stack.count() - 1)
+            while self.block_list.count() < count:
+                self.block_list.addItem(QListWidgetItem())
+                self.block_stack.addItem(QListWidgetItem())
+            for idx in range(count):
+                self._update_stack_item(idx)
+        finally:
+            for widget in lists:
+                widget.blockSignals(False)
+                widget.setUpdatesEnabled(True)
+
+    def _recount_document_chars(self) -> None:
+        self._document_chars = sum(len(block.raw) for block in self.document.blocks)
+
+    def _activate_row(self, row: int) -> None:
+        """Select ``row`` in both lists and load it into the editor."""
 
         if self.document.blocks:
-            if select_last:
-                target_row = len(self.document.blocks) - 1
-            elif select_row is not None:
-                target_row = select_row
-            else:
-                target_row = 0
-            self._select_row(target_row)
-            self._load_editor_from_row(target_row)
-            self._remember_selected_block(target_row)
+            self._select_row(row)
+            self._load_editor_from_row(row)
+            self._remember_selected_block(row)
             self._scroll_preview_later()
         else:
-            self.editor.blockSignals(True)
-            self.editor.clear()
-            self.editor.blockSignals(False)
+            self._load_editor_from_row(-1)
 
     def _select_row(self, row: int) -> None:
         """Sync selection across both block lists without feedback loops."""
@@ -432,37 +818,113 @@ class NotebookTab(QWidget):
         return self.block_list.currentRow()
 
     def _load_editor_from_row(self, row: int) -> None:
-        if row < 0 or row >= len(self.document.blocks):
-            self.editor.blockSignals(True)
-            self.editor.clear()
+        self.editor.blockSignals(True)
+        try:
+            if row < 0 or row >= len(self.document.blocks):
+                self._blank_doc.clear()
+                self.editor.setDocument(self._blank_doc)
+                self.paren_highlighter = None
+                return
+            doc, self.paren_highlighter = self._editor_doc(self.document.blocks[row])
+            if self.editor.document() is not doc:
+                self.editor.setDocument(doc)
+        finally:
             self.editor.blockSignals(False)
-            return
+
+    def _editor_doc(self, block: Block) -> tuple[QTextDocument, ParenthesisHighlighter]:
+        """Return the block's editor document, creating it or resyncing it after undo/redo."""
+
+        entry = self._editor_docs.get(block.block_id)
+        if entry is None:
+            doc = QTextDocument(self)
+            doc.setDefaultFont(self.editor.font())
+            highlighter = ParenthesisHighlighter(doc)
+            highlighter.enabled = self._wants_highlighting(block)
+            doc.setPlainText(block.raw)
+            entry = self._editor_docs[block.block_id] = (doc, highlighter)
+            return entry
+        doc, highlighter = entry
+        if doc.toPlainText() != block.raw:
+            # Replace through a cursor rather than setPlainText: the document
+            # keeps its undo history and the highlighter only sees one change.
+            cursor = QTextCursor(doc)
+            cursor.beginEditBlock()
+            cursor.select(QTextCursor.SelectionType.Document)
+            cursor.insertText(block.raw)
+            cursor.endEditBlock()
+        if highlighter.enabled != self._wants_highlighting(block):
+            # The block crossed the size limit since it was last opened.
+            highlighter.enabled = not highlighter.enabled
+            highlighter.rehighlight()
+        return entry
+
+    def _wants_highlighting(self, block: Block) -> bool:
+        return block.kind == "formula" and len(block.raw) < self.LARGE_BLOCK_CHARS
+
+    def _prune_editor_docs(self) -> None:
+        """Drop editor documents of blocks that are no longer in the notebook."""
+
+        live = {block.block_id for block in self.document.blocks}
+        for block_id in [block_id for block_id in self._editor_docs if block_id not in live]:
+            doc, _highlighter = self._editor_docs.pop(block_id)
+            if self.editor.document() is doc:
+                self.editor.blockSignals(True)
+                self.editor.setDocument(self._blank_doc)
+                self.editor.blockSignals(False)
+            doc.deleteLater()
+
+    def _block_labels(self, row: int) -> tuple[str, str, str]:
+        """Return the (block list label, stack label, stack tooltip) for ``row``, without the row number."""
+
         block = self.document.blocks[row]
-        self.editor.blockSignals(True)
-        self.editor.setPlainText(block.raw)
-        self.editor.blockSignals(False)
-        if self.paren_highlighter:
-            self.paren_highlighter.enabled = isinstance(block, FormulaBlock)
-            self.paren_highlighter.rehighlight()
+        cached = self._block_titles.get(block.block_id)
+        if cached is None:
+            title = block.kind.capitalize()
+            cached = self._block_titles[block.block_id] = (title, f"{title} [{block.block_id[:6]}]")
+        title, list_label = cached
+        return list_label, f"{title}: {self._summary_line(block.raw)}", block.raw.strip() or title
+
+    @staticmethod
+    def _summary_line(raw: str) -> str:
+        """First non-blank line of ``raw``, cut to 60 characters."""
+
+        # Longer lines are truncated anyway, so only the head of the text is split.
+        lines = raw.lstrip()[:61].splitlines()
+        if not lines:
+            return "(empty)"
+        summary = lines[0].rstrip()
+        if len(summary) > 60:
+            summary = summary[:57] + "..."
+        return summary
 
     def _update_stack_item(self, row: int) -> None:
         """Refresh the stacked/raw list label for a single row without rebuilding all items."""
 
         if row < 0 or row >= len(self.document.blocks):
             return
-        block = self.document.blocks[row]
-        title = "Text" if isinstance(block, TextBlock) else "Formula"
-        summary = block.raw.strip().splitlines()[0] if block.raw.strip() else "(empty)"
-        if len(summary) > 60:
-            summary = summary[:57] + "..."
-        stack_label = f"{row + 1}. {title}: {summary}"
+        list_label, stack_label, tooltip = self._block_labels(row)
         stack_item = self.block_stack.item(row)
         if stack_item:
             stack_item.setText(stack_label)
-            stack_item.setToolTip(block.raw.strip() or title)
+            stack_item.setToolTip(tooltip)
         list_item = self.block_list.item(row)
         if list_item:
-            list_item.setText(f"{row + 1}. {title} [{block.block_id[:6]}]")
+            list_item.setText(list_label)
+
+    def _update_edited_item(self, row: int, previous_raw: str) -> None:
+        """Per-keystroke variant of ``_update_stack_item``.
+
+        An edit never changes the block list label, and changes the stack
+        label only when the summary line does; the tooltip always follows the text.
+        """
+        stack_item = self.block_stack.item(row)
+        if stack_item is None:
+            return
+        block = self.document.blocks[row]
+        if self._summary_line(block.raw) != self._summary_line(previous_raw):
+            self._update_stack_item(row)
+            return
+        stack_item.setToolTip(block.raw.strip() or block.kind.capitalize())
 
     def _focus_stack(self) -> None:
         self.block_stack.setFocus(Qt.FocusReason.OtherFocusReason)
@@ -470,9 +932,8 @@ class NotebookTab(QWidget):
     def _update_hint(self, raw_text: str) -> None:
         """Show a gentle reminder when implicit multiplication is detected."""
 
-        pattern = re.compile(r"(\d)([A-Za-z])|(\d)\(|\)(\d)|\)([A-Za-z])|([A-Za-z])\(")
         message = "Usa * para multiplicar: ej. 3*a, 2*d, a*(b)"
-        if pattern.search(raw_text):
+        if _IMPLICIT_MUL_RE.search(raw_text):
             self.hint_label.setText(message)
         else:
             self.hint_label.setText("")
@@ -502,41 +963,201 @@ class NotebookTab(QWidget):
         if row < 0 or row >= len(self.document.blocks):
             return
         block = self.document.blocks[row]
-        block.raw = self.editor.toPlainText()
-        if isinstance(block, FormulaBlock):
-            block.evaluate()
-        self._update_stack_item(row)
+        text = self.editor.toPlainText()
+        if text == block.raw:
+            # Loading a block into the editor or a no-op edit; nothing to re-evaluate.
+            return
+        previous = block.raw
+        # Keep the model and labels in sync per keystroke (cheap); evaluation
+        # and the preview wait until typing pauses.
+        block.raw = text
+        self._document_chars += len(text) - len(previous)
+        self._update_edited_item(row, previous)
+        if block.kind == "formula" and text.strip() == previous.strip():
+            # Formulas are evaluated stripped, so surrounding whitespace cannot
+            # change the output (an already pending edit still fires).
+            return
+        self._pending_block = block
+        if self._document_chars > self.LARGE_DOCUMENT_CHARS:
+            interval = self.LARGE_DEBOUNCE_MS
+        elif block.kind == "formula" and not _expression_looks_complete(text):
+            interval = self.INCOMPLETE_DEBOUNCE_MS
+        else:
+            interval = self.EDIT_DEBOUNCE_MS
+        self._edit_timer.setInterval(interval)
+        self._edit_timer.start()
+
+    def _apply_editor_changes(self) -> None:
+        """Re-render the preview for the last edit (the render re-evaluates every block)."""
+
+        self._edit_timer.stop()
+        block, self._pending_block = self._pending_block, None
+        if block is None:
+            return
         self.update_preview()
         self._update_hint(block.raw)
 
     def update_preview(self) -> None:
-        """Render the document into the web view with MathJax."""
-        mathjax_path, mathjax_url = self._mathjax_args(for_export=False)
-        html_content = self.document.to_html(
-            renderer=self.renderer,
-            mathjax_path=mathjax_path,
-            mathjax_url=mathjax_url,
-            options=self._evaluation_options(hide_logs=False),
+        """Re-evaluate and render the document off the GUI thread, then show it.
+
+        At most one render runs at a time; requests made meanwhile are folded
+        into a single follow-up render of the latest document.
+        """
+        if self._render_running:
+            self._render_stale = True
+            return
+        if self._shown_key is not None and self._preview_key() == self._shown_key:
+            # E.g. an edit undone before the debounce fired: reuse the last render.
+            self._show_preview(*self._stored_preview_parts())
+            return
+        self._start_render()
+
+    def _preview_key(self) -> tuple:
+        return tuple((block.block_id, block.kind, block.raw) for block in self.document.blocks)
+
+    def _stored_preview_parts(self) -> tuple[list[tuple[str, str]], str]:
+        blocks = [(element_id, self._preview_fragments[element_id]) for element_id in self._preview_order]
+        return blocks, self._preview_fragments["notebook-summary"]
+
+    def _start_render(self) -> None:
+        self._render_running = True
+        self._render_stale = False
+        self._render_key = self._preview_key()
+        job = RenderJob(
+            self._document_snapshot(), self.renderer, self._evaluation_options(hide_logs=False)
         )
-        self.preview.setHtml(html_content)
-        self._scroll_preview_later()
+        job.signals.finished.connect(self._on_render_finished)
+        self._render_job = job
+        self._render_pool.start(job)
+
+    def _on_render_finished(self, parts) -> None:
+        self._render_running = False
+        self._render_job = None
+        stale, self._render_stale = self._render_stale, False
+        if stale and self._preview_key() != self._render_key:
+            # The document changed while this render ran, so its output is already outdated.
+            self._start_render()
+            return
+        if isinstance(parts, Exception):
+            self._shown_key = None
+            self.hint_label.setText(f"Preview failed: {parts}")
+            return
+        self._shown_key = self._render_key
+        self._show_preview(*parts)
+
+    def showEvent(self, event) -> None:  # noqa: N802
+        if not self._toolbar_host.layout().count():
+            # Built before the first paint so the toolbar appears with the tab.
+            self._toolbar_host.layout().addWidget(self._build_toolbar())
+        super().showEvent(event)
+        if self.preview is None:
+            # Let the window paint first, then start the web engine.
+            QTimer.singleShot(0, self._ensure_preview)
+
+    def _ensure_preview(self) -> None:
+        """Create the web view on first use and show the latest render in it."""
+
+        if self.preview is not None:
+            return
+        self.preview = QWebEngineView()
+        self._preview_dir = QTemporaryDir()
+        self._preview_channel = QWebChannel(self.preview.page())
+        self._preview_channel.registerObject("bridge", self.preview_bridge)
+        self.preview.page().setWebChannel(self._preview_channel)
+        self.preview.loadFinished.connect(self._on_preview_loaded)
+        self._preview_host.layout().addWidget(self.preview)
+        if self._preview_fragments:
+            self._show_preview(*self._stored_preview_parts())
+
+    def _show_preview(self, blocks: list[tuple[str, str]], summary: str) -> None:
+        """Put rendered parts into the web view.
+
+        The page is only (re)loaded for the first render or when the MathJax
+        source changes; it is written to a temporary file and loaded by URL,
+        which avoids setHtml's 2 MB limit and copying the HTML string into
+        the renderer process. Otherwise the blocks whose HTML changed, the new block
+        order and the summary panels are sent to the loaded page, which swaps
+        them in place; renders made while the page loads are sent once it is ready.
+        """
+        shell = self._mathjax_args(for_export=False)
+        self._preview_fragments = dict(blocks)
+        self._preview_fragments["notebook-summary"] = summary
+        self._preview_order = [element_id for element_id, _ in blocks]
+        if self.preview is None:
+            return
+
+        if shell != self._preview_shell:
+            mathjax_path, mathjax_url = shell
+            if mathjax_path:
+                # Reference the local bundle instead of inlining it so the
+                # engine can cache the script.
+                mathjax_url = QUrl.fromLocalFile(os.path.abspath(mathjax_path)).toString()
+                mathjax_path = None
+            html = self.renderer.render_page(
+                blocks,
+                summary,
+                mathjax_path=mathjax_path,
+                mathjax_url=mathjax_url,
+                head_extra=_PREVIEW_CHANNEL_JS,
+            )
+            page_path = self._preview_dir.filePath("preview.html")
+            try:
+                with open(page_path, "w", encoding="utf-8") as handle:
+                    handle.write(html)
+            except OSError as exc:
+                self.hint_label.setText(f"Preview failed: {exc}")
+                return
+            self._preview_shell = shell
+            self._preview_loaded = False
+            self._page_fragments = dict(self._preview_fragments)
+            self._page_order = list(self._preview_order)
+            self.preview.load(QUrl.fromLocalFile(page_path))
+            self._scroll_preview_later()
+        elif self._preview_loaded:
+            self._push_preview_delta()
+
+    def _on_preview_loaded(self, ok: bool) -> None:
+        if not ok:
+            # Force a fresh page load on the next render.
+            self._preview_loaded = False
+            self._preview_shell = None
+
+    def _on_preview_ready(self) -> None:
+        self._preview_loaded = True
+        self._push_preview_delta()
+
+    def _push_preview_delta(self) -> None:
+        """Send the fragments that differ from what the page shows."""
+
+        changed = {
+            element_id: html
+            for element_id, html in self._preview_fragments.items()
+            if self._page_fragments.get(element_id) != html
+        }
+        if not changed and self._preview_order == self._page_order:
+            return
+        payload = {"order": self._preview_order, "fragments": changed}
+        self.preview_bridge.blocksChanged.emit(json.dumps(payload))
+        self._page_fragments = dict(self._preview_fragments)
+        self._page_order = list(self._preview_order)
 
     def _scroll_preview_later(self) -> None:
         """Scroll to the last selected block after the preview is ready."""
 
-        if not self._last_selected_block_id:
+        if not self._last_selected_block_id or self.preview is None:
             return
+        self._scroll_timer.start()
 
-        def _scroll():
-            js = (
-                "(() => {"
-                f" const el = document.getElementById('block-{self._last_selected_block_id}');"
-                " if (el) { el.scrollIntoView({behavior: 'smooth', block: 'center'}); }"
-                "})();"
-            )
-            self.preview.page().runJavaScript(js)
-
-        QTimer.singleShot(150, _scroll)
+    def _scroll_preview(self) -> None:
+        if not self._last_selected_block_id or self.preview is None:
+            return
+        js = (
+            "(() => {"
+            f" const el = document.getElementById('block-{self._last_selected_block_id}');"
+            " if (el) { el.scrollIntoView({behavior: 'smooth', block: 'center'}); }"
+            "})();"
+        )
+        self.preview.page().runJavaScript(js)
 
     def export_html(self) -> None:
         """Persist the rendered notebook to an HTML file."""
@@ -555,19 +1176,21 @@ class NotebookTab(QWidget):
                 "Local MathJax bundle not found. Falling back to CDN.",
             )
             mathjax_path = None
-            mathjax_url = "https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"
-
-        try:
-            self.document.save_html(
-                path,
-                renderer=self.renderer,
+            mathjax_url = MATHJAX_CDN_URL
+
+        snapshot = self._document_snapshot()
+        options = self._evaluation_options(hide_logs=self._hide_logs_pref())
+        self._start_export(
+            path,
+            "HTML",
+            lambda target: snapshot.save_html(
+                target,
+                renderer=NotebookRenderer(),
                 mathjax_path=mathjax_path,
                 mathjax_url=mathjax_url,
-                options=self._evaluation_options(hide_logs=self._hide_logs_pref()),
-            )
-            QMessageBox.information(self, "Export complete", f"Saved HTML to {path}")
-        except Exception as exc:  # pylint: disable=broad-except
-            QMessageBox.critical(self, "Export failed", str(exc))
+                options=options,
+            ),
+        )
 
     def export_markdown(self) -> None:
         """Save the notebook as a Markdown document."""
@@ -578,13 +1201,29 @@ class NotebookTab(QWidget):
         if not path:
             return
 
-        try:
-            self.document.save_markdown(path)
-            QMessageBox.information(
-                self, "Export complete", f"Saved Markdown to {path}"
-            )
-        except Exception as exc:  # pylint: disable=broad-except
-            QMessageBox.critical(self, "Export failed", str(exc))
+        self._start_export(path, "Markdown", self._document_snapshot().save_markdown)
+
+    def _document_snapshot(self) -> Document:
+        """Copy of the document for background work, so edits cannot race it."""
+
+        return Document.from_dict(self.document.to_dict())
+
+    def _start_export(self, path: str, kind: str, write) -> None:
+        """Run ``write(path)`` on the thread pool and report when it is done."""
+
+        job = ExportJob(path, kind, write)
+        job.signals.finished.connect(self._on_export_finished)
+        self._export_jobs.append(job)
+        self.hint_label.setText(f"Exporting {kind}...")
+        QThreadPool.globalInstance().start(job)
+
+    def _on_export_finished(self, job: ExportJob, error: str) -> None:
+        self._export_jobs.remove(job)
+        self.hint_label.setText("")
+        if error:
+            QMessageBox.critical(self, "Export failed", error)
+        else:
+            QMessageBox.information(self, "Export complete", f"Saved {job.kind} to {job.path}")
 
     # Toolbar helpers
     def _build_toolbar(self) -> QWidget:
@@ -596,7 +1235,7 @@ class NotebookTab(QWidget):
         layout.setSpacing(4)
         container.setMinimumWidth(220)
 
-        def _add_group(title: str, items: list[tuple[str, str]]) -> None:
+        def _add_group(title: str, items: tuple[tuple[str, str], ...]) -> None:
             lbl = QLabel(title)
             lbl.setStyleSheet("font-weight: bold; margin-top: 4px;")
             layout.addWidget(lbl)
@@ -609,87 +1248,41 @@ class NotebookTab(QWidget):
                 btn = QToolButton()
                 btn.setText(label)
                 btn.setToolTip(f"Insert {label}")
-                btn.clicked.connect(lambda _=False, s=snippet: self.insert_snippet(s))
+                btn.setProperty("snippet", snippet)
+                btn.clicked.connect(self._on_snippet_clicked)
                 btn.setMinimumWidth(52)
                 btn.setMinimumHeight(24)
                 row, col = divmod(idx, 3)
                 grid.addWidget(btn, row, col)
             layout.addWidget(grid_widget)
 
-        _add_group("Operadores", [
-            ("+", " + "),
-            ("-", " - "),
-            ("*", " * "),
-            ("/", " / "),
-            ("^", " ** "),
-            ("sqrt", "sqrt()"),
-            ("?", " \u22c5 "),
-            ("?", " \u2248 "),
-        ])
-
-        _add_group("Funciones", [
-            ("sin", "sin()"),
-            ("cos", "cos()"),
-            ("tan", "tan()"),
-            ("exp", "exp()"),
-            ("log", "log()"),
-            ("pi", "pi"),
-            ("abs", "abs()"),
-        ])
-
-        _add_group("Agregados", [
-            ("sum", "sum()"),
-            ("min", "min()"),
-            ("max", "max()"),
-            ("range", "range()"),
-        ])
-
-        _add_group("Arrays", [
-            ("linspace", "linspace( , , )"),
-            ("arange", "arange( , , )"),
-            ("sweep", "sweep(f, xs)"),
-        ])
-
-        _add_group("Condicionales", [
-            ("if/else", "(a) if (condicion) else (b)"),
-            ("if/elif/else", "(a) if (cond1) else ((b) if (cond2) else (c))"),
-        ])
-
-        _add_group("Lógico", [
-            ("A and B", "(A) and (B)"),
-            ("A or B", "(A) or (B)"),
-            ("not A", "not (A)"),
-        ])
-
-        _add_group("Definir f(x)", [
-            ("f(x)", "f(x) = "),
-        ])
-
-        _add_group("LaTeX", [
-            ("Inline $", r"$ $"),
-            ("Frac", r"\frac{}{}"),
-            ("Sqrt", r"\sqrt{}"),
-            ("Sub", r"x_{}"),
-            ("Sup", r"x^{}"),
-        ])
+        for title, items in self.TOOLBAR_SNIPPETS:
+            _add_group(title, items)
 
         greek_label = QLabel("Greek")
         greek_label.setStyleSheet("font-weight: bold; margin-top: 4px;")
         layout.addWidget(greek_label)
         self.greek_combo = QComboBox()
-        greek_items = [r"\alpha", r"\beta", r"\gamma", r"\delta", r"\phi", r"\theta", r"\lambda", r"\pi", r"\sigma", r"\omega"]
-        self.greek_combo.addItems(greek_items)
+        self.greek_combo.setModel(QStringListModel(list(self.GREEK_SYMBOLS), self.greek_combo))
         self.greek_combo.setToolTip("Insert Greek symbol (LaTeX)")
         greek_btn = QToolButton()
         greek_btn.setText("Insert")
         greek_btn.setToolTip("Insert selected Greek symbol")
-        greek_btn.clicked.connect(lambda: self.insert_snippet(self.greek_combo.currentText()))
+        greek_btn.clicked.connect(self._insert_greek_symbol)
         layout.addWidget(self.greek_combo)
         layout.addWidget(greek_btn)
 
         layout.addStretch()
         return container
 
+    def _on_snippet_clicked(self) -> None:
+        """Shared slot for the toolbar buttons; each carries its text in a property."""
+
+        self.insert_snippet(self.sender().property("snippet"))
+
+    def _insert_greek_symbol(self) -> None:
+        self.insert_snippet(self.greek_combo.currentText())
+
     def insert_snippet(self, text: str) -> None:
         """Insert a math snippet at the current cursor position."""
 
@@ -698,13 +1291,10 @@ class NotebookTab(QWidget):
         self.editor.setTextCursor(cursor)
 
     def _hide_logs_pref(self) -> bool:
-        stored = self.settings.value("render/hide_logs", False)
-        if isinstance(stored, str):
-            return stored.lower() in {"1", "true", "yes"}
-        return bool(stored)
+        return self.settings.bool_value("render/hide_logs")
 
     def _mathjax_args(self, for_export: bool = False) -> tuple[str | None, str | None]:
-        default_cdn = "https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"
+        default_cdn = MATHJAX_CDN_URL
         mode = str(self.settings.value("render/mathjax_mode", "cdn") or "cdn")
         path = str(self.settings.value("render/mathjax_path", "") or "")
         if mode == "local":
@@ -0,0 +1,120 @@
+"""In-memory cache over the persistent application settings."""
+from __future__ import annotations
+
+import logging
+from typing import Any, Final
+
+import keyring
+from keyring.errors import KeyringError
+from PySide6.QtCore import QSettings
+
+_MISSING = object()
+_log = logging.getLogger(__name__)
+
+# The OpenAI key goes to the OS keychain; QSettings (plain text) is only the
+# fallback when no keychain backend works (e.g. headless Linux).
+KEYCHAIN_SERVICE: Final = "PDFtoMD"
+API_KEY_SETTING: Final = "openai_api_key"
+_TRUTHY: Final = frozenset(("1", "true", "yes", "on"))
+
+
+def as_bool(value: Any) -> bool:
+    """Normalize a stored flag; INI backends hand booleans back as strings."""
+    return value.lower() in _TRUTHY if isinstance(value, str) else bool(value)
+
+
+class CachedSettings:
+    """Read-through/write-through cache around ``QSettings``.
+
+    Each key hits the registry/INI backend at most once per session; writes go
+    to the backend only when the value actually changes. Exposes the same
+    ``value``/``setValue`` calls as ``QSettings`` so callers need no changes.
+    """
+
+    def __init__(self, settings: QSettings | None = None) -> None:
+        self._qs = settings if settings is not None else QSettings("MyCompany", "PDFtoMD")
+        self._cache: dict[str, Any] = {}
+        self._groups: list[str] = []
+
+    def _key(self, key: str) -> str:
+        return "/".join((*self._groups, key)) if self._groups else key
+
+    def beginGroup(self, prefix: str) -> None:  # noqa: N802 - mirrors QSettings
+        self._groups.append(prefix)
+
+    def endGroup(self) -> None:  # noqa: N802 - mirrors QSettings
+        self._groups.pop()
+
+    def sync(self) -> None:
+        """Flush pending writes to the backend in one go."""
+        self._qs.sync()
+
+    def value(self, key: str, default: Any = None) -> Any:
+        key = self._key(key)
+        cached = self._cache.get(key, _MISSING)
+        if cached is _MISSING:
+            cached = self._qs.value(key) if self._qs.contains(key) else None
+            self._cache[key] = cached
+        return default if cached is None else cached
+
+    def setValue(self, key: str, value: Any) -> None:  # noqa: N802 - mirrors QSettings
+        key = self._key(key)
+        if key in self._cache and self._cache[key] == value:
+            return
+        self._cache[key] = value
+        self._qs.setValue(key, value)
+
+    def bool_value(self, key: str, default: bool = False) -> bool:
+        """Like ``value`` but coerced to ``bool``; the coerced value is cached."""
+        value = as_bool(self.value(key, default))
+        full_key = self._key(key)
+        if self._cache.get(full_key) is not None:
+            self._cache[full_key] = value
+        return value
+
+
+_APP_SETTINGS: CachedSettings | None = None
+
+
+def app_settings() -> CachedSettings:
+    """Process-wide settings instance shared by every window, tab and dialog."""
+    global _APP_SETTINGS
+    if _APP_SETTINGS is None:
+        _APP_SETTINGS = CachedSettings()
+    return _APP_SETTINGS
+
+
+def load_api_key(settings: CachedSettings) -> str:
+    """Read the OpenAI key, moving a plain-text QSettings copy into the keychain."""
+    stored = settings.value(API_KEY_SETTING, "") or ""
+    try:
+        key = keyring.get_password(KEYCHAIN_SERVICE, API_KEY_SETTING)
+        if key is None and stored:
+            keyring.set_password(KEYCHAIN_SERVICE, API_KEY_SETTING, stored)
+            settings.setValue(API_KEY_SETTING, "")
+            key = stored
+    except KeyringError as exc:
+        if stored:
+            _log.warning("Keychain unavailable (%s); the OpenAI key stays in plain-text settings.", exc)
+        return stored
+    return key or ""
+
+
+def save_api_key(settings: CachedSettings, api_key: str) -> bool:
+    """Persist the OpenAI key in the keychain.
+
+    Returns False when no keychain backend works and the key had to be
+    written to QSettings in plain text instead, so the caller can tell the user.
+    """
+    try:
+        if api_key:
+            keyring.set_password(KEYCHAIN_SERVICE, API_KEY_SETTING, api_key)
+        elif keyring.get_password(KEYCHAIN_SERVICE, API_KEY_SETTING) is not None:
+            keyring.delete_password(KEYCHAIN_SERVICE, API_KEY_SETTING)
+    except KeyringError as exc:
+        _log.warning("Keychain unavailable (%s); storing the OpenAI key in plain-text settings.", exc)
+        settings.setValue(API_KEY_SETTING, api_key)
+        # Clearing the key leaves no secret in plain text.
+        return not api_key
+    settings.setValue(API_KEY_SETTING, "")
+    return True
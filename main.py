@@ -1,9 +1,12 @@
 import sys
-from PySide6.QtWidgets import QApplication
-from gui.mainwindow import MainWindow
-from gui.styles import apply_styles
 
 def main():
+    # Imported here, not at module level: local conversions run in spawned
+    # worker processes that re-import this module, and must not load Qt.
+    from PySide6.QtWidgets import QApplication
+    from gui.mainwindow import MainWindow
+    from gui.styles import apply_styles
+
     app = QApplication(sys.argv)
     
     # Apply global styles
@@ -4,9 +4,9 @@ from __future__ import annotations
 import html
 import ast
 import re
-from functools import cached_property
+from functools import lru_cache
 from dataclasses import dataclass, field
-from typing import List, Optional, TYPE_CHECKING
+from typing import ClassVar, List, Optional, TYPE_CHECKING
 from uuid import uuid4
 import copy
 import json
@@ -30,6 +30,12 @@ from notebook.units import math_env
 if TYPE_CHECKING:  # Avoid runtime import cycles with the renderer
     from notebook.renderer import NotebookRenderer
 
+# Default MathJax bundle for HTML output, re-exported by notebook.renderer.
+# It lives here because the renderer imports this module, so this module
+# cannot import it from the renderer at load time. SVG output typesets
+# faster than CommonHTML and needs no web fonts.
+MATHJAX_CDN_URL = "https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-svg.js"
+
 
 @dataclass
 class SymbolRegistry(dict):
@@ -46,6 +52,69 @@ class SymbolRegistry(dict):
         return symbol
 
 
+# Helpers rebuilt as fresh Function subclasses for every symbolic parse.
+_FRESH_FUNCTIONS = ("linspace", "arange", "sweep", "sum", "min", "max", "range")
+_TRANSFORMATIONS = standard_transformations + (convert_equals_signs,)
+
+
+@lru_cache(maxsize=256)
+def _parse_cached(expr: str, overrides: Optional[tuple[tuple[str, object], ...]]) -> sp.Expr:
+    """Parse ``expr`` once per distinct symbol table.
+
+    ``overrides`` holds the symbol entries that differ from a plain
+    ``Symbol(name)`` (helpers, user functions, shadowed names); ``None`` parses
+    without a local dict. SymPy expressions are immutable, so sharing is safe.
+    """
+
+    if overrides is None:
+        return parse_expr(expr, transformations=_TRANSFORMATIONS)
+    local_dict = SymbolRegistry()
+    local_dict.update(overrides)
+    for name in _FRESH_FUNCTIONS:
+        local_dict[name] = type(name, (sp.Function,), {})
+    return parse_expr(expr, local_dict=local_dict, transformations=_TRANSFORMATIONS)
+
+
+def _latex(expr, mul_symbol: Optional[str] = None) -> str:
+    """``sp.latex`` with ``order="none"``; SymPy objects are memoized, plain values (lists) are not."""
+
+    if isinstance(expr, sp.Basic):
+        return _latex_cached(expr, mul_symbol)
+    return _latex_uncached(expr, mul_symbol)
+
+
+def _latex_uncached(expr, mul_symbol: Optional[str] = None) -> str:
+    if mul_symbol is None:
+        return sp.latex(expr, order="none")
+    return sp.latex(expr, order="none", mul_symbol=mul_symbol)
+
+
+_latex_cached = lru_cache(maxsize=256)(_latex_uncached)
+
+
+def _lambdify(params: list[str], expr):
+    """Compile a user function body, once per parameter list and SymPy expression."""
+
+    if isinstance(expr, sp.Basic):
+        return _lambdify_cached(tuple(params), expr)
+    return _lambdify_uncached(tuple(params), expr)
+
+
+def _lambdify_uncached(params: tuple[str, ...], expr):
+    return sp.lambdify([sp.Symbol(p) for p in params], expr, modules="math")
+
+
+_lambdify_cached = lru_cache(maxsize=128)(_lambdify_uncached)
+
+
+def clear_expression_cache() -> None:
+    """Drop memoized parses, LaTeX and compiled functions, e.g. when a different notebook is loaded."""
+
+    _parse_cached.cache_clear()
+    _latex_cached.cache_clear()
+    _lambdify_cached.cache_clear()
+
+
 @dataclass
 class VariableRecord:
     """Stores the evaluation details for a single variable."""
@@ -211,17 +280,28 @@ class Block:
 class TextBlock(Block):
     """Text block that stores explanatory content."""
 
+    kind: ClassVar[str] = "text"
+
     def to_html(self) -> str:
-        rendered = self._markdown.render(self.raw)
-        sanitized = html.escape(self.raw) if not rendered else self._sanitize(rendered)
         return (
             f"<div class='text-block' id='block-{self.block_id}' data-block-id='{self.block_id}'>"
-            f"{sanitized}"
+            f"{self._render_body(self.raw)}"
             "</div>"
         )
 
-    @cached_property
-    def _markdown(self):
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _render_body(raw: str) -> str:
+        """Markdown to sanitized HTML; both steps are pure, so results are memoized on the text."""
+
+        rendered = TextBlock._markdown().render(raw)
+        return html.escape(raw) if not rendered else TextBlock._sanitize(rendered)
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _markdown():
+        """Markdown parser shared by every text block."""
+
         try:
             from markdown_it import MarkdownIt
 
@@ -291,6 +371,8 @@ class TextBlock(Block):
 class FormulaBlock(Block):
     """Math expression block evaluated with SymPy."""
 
+    kind: ClassVar[str] = "formula"
+
     sympy_expr: Optional[sp.Expr] = None
     result: Optional[str] = None
     latex: Optional[str] = None
@@ -493,30 +575,21 @@ class FormulaBlock(Block):
                     context.symbols[func_name] = sp.Function(func_name)
 
             # Always ensure linspace and arange are Functions (create fresh objects)
-            linspace_func = type('linspace', (sp.Function,), {})
-            arange_func = type('arange', (sp.Function,), {})
-            sweep_func = type('sweep', (sp.Function,), {})
-            sum_func = type('sum', (sp.Function,), {})
-            min_func = type('min', (sp.Function,), {})
-            max_func = type('max', (sp.Function,), {})
-            range_func = type('range', (sp.Function,), {})
-            context.symbols["linspace"] = linspace_func
-            context.symbols["arange"] = arange_func
-            context.symbols["sweep"] = sweep_func
-            context.symbols["sum"] = sum_func
-            context.symbols["min"] = min_func
-            context.symbols["max"] = max_func
-            context.symbols["range"] = range_func
-
-            return parse_expr(
-                expr,
-                local_dict=context.symbols,
-                transformations=standard_transformations + (convert_equals_signs,),
+            for name in _FRESH_FUNCTIONS:
+                context.symbols[name] = type(name, (sp.Function,), {})
+
+            overrides = tuple(
+                sorted(
+                    (
+                        (name, obj)
+                        for name, obj in context.symbols.items()
+                        if name not in _FRESH_FUNCTIONS and obj != sp.Symbol(name)
+                    ),
+                    key=lambda item: item[0],
+                )
             )
-        return parse_expr(
-            expr,
-            transformations=standard_transformations + (convert_equals_signs,),
-        )
+            return _parse_cached(expr, overrides)
+        return _parse_cached(expr, None)
 
     @staticmethod
     def _normalize_expression(expression: str) -> str:
@@ -706,9 +779,6 @@ class FormulaBlock(Block):
                         self.function_params = params
 
                         try:
-                            # Create sympy symbols for parameters
-                            param_symbols = [sp.Symbol(p) for p in params]
-
                             # Parse RHS with parameter symbols in context
                             temp_context = copy.copy(context)
                             for param in params:
@@ -719,7 +789,7 @@ class FormulaBlock(Block):
 
                             # Create sympy lambda function
                             # Use math module instead of numpy to avoid dependency issues
-                            sympy_lambda = sp.lambdify(param_symbols, func_expr, modules='math')
+                            sympy_lambda = _lambdify(params, func_expr)
 
                             # Register function
                             context.register_function(func_name, params, rhs, sympy_lambda)
@@ -729,7 +799,7 @@ class FormulaBlock(Block):
                             self.result = f"Function {func_name}({params_str}) defined"
 
                             # Generate LaTeX
-                            func_expr_latex = sp.latex(func_expr, order="none", mul_symbol=" \\cdot ")
+                            func_expr_latex = _latex(func_expr, " \\cdot ")
                             func_expr_latex = self._cleanup_latex(func_expr_latex)
                             self.latex = f"{html.escape(func_name)}({html.escape(params_str)}) = {func_expr_latex}"
 
@@ -756,7 +826,7 @@ class FormulaBlock(Block):
                     numeric_value, numeric_error = self._evaluate_numeric(rhs, context)
                     if numeric_error is not None:
                         expr_latex = (
-                            sp.latex(self.sympy_expr, order="none") if self.sympy_expr is not None else html.escape(rhs)
+                            _latex(self.sympy_expr) if self.sympy_expr is not None else html.escape(rhs)
                         )
                         self._handle_evaluation_error(numeric_error, context, expr_latex, lhs)
                         return
@@ -796,7 +866,7 @@ class FormulaBlock(Block):
                             self.result = str(evaluated)
 
                     expr_latex = (
-                        sp.latex(self.sympy_expr, order="none", mul_symbol=" \\cdot ")
+                        _latex(self.sympy_expr, " \\cdot ")
                         if self.sympy_expr is not None
                         else html.escape(rhs)
                     )
@@ -813,7 +883,7 @@ class FormulaBlock(Block):
                 self.evaluation_status = "error"
                 self.error_type = type(numeric_error).__name__
                 self.error_message = str(numeric_error)
-                self.latex = sp.latex(self.sympy_expr, order="none")
+                self.latex = _latex(self.sympy_expr)
                 context.register_error(
                     block_id=self.block_id,
                     message=self.error_message,
@@ -841,7 +911,7 @@ class FormulaBlock(Block):
                         self.numeric_value = float(evaluated)
                     except (TypeError, ValueError):
                         self.numeric_value = None
-            self.latex = sp.latex(self.sympy_expr, order="none", mul_symbol=" \\cdot ")
+            self.latex = _latex(self.sympy_expr, " \\cdot ")
             self.latex = self._cleanup_latex(self.latex)
         except Exception as exc:  # pylint: disable=broad-except
             # Keep evaluation errors but continue showing them in the UI.
@@ -914,7 +984,7 @@ class Document:
         renderer: Optional["NotebookRenderer"] = None,
         *,
         mathjax_path: str | None = None,
-        mathjax_url: str | None = "https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js",
+        mathjax_url: str | None = MATHJAX_CDN_URL,
         options: Optional[NotebookOptions] = None,
     ) -> str:
         """Create an HTML preview using the provided renderer."""
@@ -933,7 +1003,7 @@ class Document:
         renderer: Optional["NotebookRenderer"] = None,
         *,
         mathjax_path: str | None = None,
-        mathjax_url: str | None = "https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js",
+        mathjax_url: str | None = MATHJAX_CDN_URL,
         options: Optional[NotebookOptions] = None,
     ) -> None:
         """Render the document to HTML and persist it to disk."""
@@ -2,10 +2,20 @@
 from __future__ import annotations
 
 import html
+import os
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Iterable
 
-from notebook.document import Document, FormulaBlock, TextBlock, VariableRecord, FunctionRecord, ArrayRecord
+from notebook.document import MATHJAX_CDN_URL, Document, FormulaBlock, TextBlock, VariableRecord, FunctionRecord, ArrayRecord
+
+
+@lru_cache(maxsize=4)
+def _read_mathjax_bundle(path: str, mtime_ns: int) -> str:
+    """Read a local MathJax bundle once per file version (``mtime_ns`` keys the cache)."""
+
+    with open(path, "r", encoding="utf-8") as handle:
+        return handle.read()
 
 
 @dataclass
@@ -30,7 +40,7 @@ class NotebookRenderer:
         document: Document,
         *,
         mathjax_path: str | None = None,
-        mathjax_url: str | None = "https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js",
+        mathjax_url: str | None = MATHJAX_CDN_URL,
         options=None,
     ) -> str:
         """Return full HTML including MathJax and styling.
@@ -40,27 +50,51 @@ class NotebookRenderer:
         ``mathjax_url`` (defaulting to the CDN build).
         """
 
+        blocks, summary = self.render_parts(document, options=options)
+        return self.render_page(blocks, summary, mathjax_path=mathjax_path, mathjax_url=mathjax_url)
+
+    def render_parts(self, document: Document, *, options=None) -> tuple[list[tuple[str, str]], str]:
+        """Evaluate ``document`` and return its HTML in patchable pieces.
+
+        Returns ``(blocks, summary)``: one ``(element_id, html)`` pair per block,
+        in order, and the ``notebook-summary`` wrapper holding the function,
+        array and variable tables plus the error and log panels.
+        """
+
         context = document.evaluate(options=options)
-        body = "\n".join(self._render_block(block) for block in document.blocks)
+        blocks = [(f"block-{block.block_id}", self._render_block(block)) for block in document.blocks]
+
+        panels = [
+            self._render_function_table(context.functions),
+            self._render_array_table(context.arrays),
+            self._render_variable_table(context.variables),
+            self._render_error_panel(context.errors),
+        ]
+        hide_logs = bool(getattr(options, "hide_logs", False)) if options is not None else False
+        if not hide_logs:
+            panels.append(self._render_log_panel(context.logs))
+        summary = "<div id='notebook-summary'>" + "\n".join(panel for panel in panels if panel) + "</div>"
+        return blocks, summary
+
+    def render_page(
+        self,
+        blocks: list[tuple[str, str]],
+        summary: str,
+        *,
+        mathjax_path: str | None = None,
+        mathjax_url: str | None = MATHJAX_CDN_URL,
+        head_extra: str = "",
+    ) -> str:
+        """Wrap the pieces from :meth:`render_parts` into a full HTML page.
+
+        ``head_extra`` is appended to ``<head>`` (the live preview uses it for
+        its update script; exports leave it empty).
+        """
+
+        body = "\n".join(fragment for _, fragment in blocks)
         if not body:
             body = "<p class='text-block'>No blocks yet.</p>"
-
-        function_table = self._render_function_table(context.functions)
-        array_table = self._render_array_table(context.arrays)
-        variable_table = self._render_variable_table(context.variables)
-        error_panel = self._render_error_panel(context.errors)
-        hide_logs = bool(getattr(options, "hide_logs", False)) if options is not None else False
-        log_panel = "" if hide_logs else self._render_log_panel(context.logs)
-        if function_table:
-            body = f"{body}\n{function_table}"
-        if array_table:
-            body = f"{body}\n{array_table}"
-        if variable_table:
-            body = f"{body}\n{variable_table}"
-        if error_panel:
-            body = f"{body}\n{error_panel}"
-        if log_panel:
-            body = f"{body}\n{log_panel}"
+        body = f"{body}\n{summary}"
 
         mathjax_script = self._mathjax_script(mathjax_path, mathjax_url)
         return f"""
@@ -72,6 +106,7 @@ class NotebookRenderer:
             <style>
                 {self._stylesheet()}
             </style>
+            {head_extra}
         </head>
         <body>
             <div class='page'>
@@ -324,8 +359,12 @@ class NotebookRenderer:
             inlineMath: [['$', '$'], ['\\\\(', '\\\\)']],
             displayMath: [['$$','$$'], ['\\\\[','\\\\]']]
           },
+          svg: {
+            fontCache: 'global'
+          },
           options: {
-            skipHtmlTags: ['script','noscript','style','textarea','pre','code']
+            skipHtmlTags: ['script','noscript','style','textarea','pre','code'],
+            enableMenu: false
           }
         };
         </script>
@@ -333,13 +372,13 @@ class NotebookRenderer:
 
         if mathjax_path:
             try:
-                with open(mathjax_path, "r", encoding="utf-8") as handle:
-                    content = handle.read()
+                content = _read_mathjax_bundle(mathjax_path, os.stat(mathjax_path).st_mtime_ns)
                 return f"{config}<script>{content}</script>"
             except OSError:
                 # Fall back to external URL if the path cannot be read.
                 pass
 
         if mathjax_url:
-            return f"{config}<script src=\"{html.escape(mathjax_url)}\"></script>"
+            # async: the page renders while the script downloads; MathJax typesets it on load.
+            return f"{config}<script async src=\"{html.escape(mathjax_url)}\"></script>"
         return config
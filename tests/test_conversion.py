@@ -1,12 +1,19 @@
+import asyncio
+import io
 import sys
 import os
 import fitz # PyMuPDF
 import pathlib
+from types import SimpleNamespace
+from PIL import Image
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from converter import ai_agent, local_pool
+from converter.ai_agent import AIAgent
 from converter.engine import PDFConverter
+from converter.llm_cache import LLMCache
 
 def create_test_pdf(filename):
     doc = fitz.open()
@@ -58,5 +65,280 @@ def test_conversion():
         if os.path.exists("test_doc.md"):
             os.remove("test_doc.md")
 
+class _FakeAgent:
+    """Stand-in for AIAgent that finishes later pages first."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.batches = []
+
+    async def convert_page_async(self, image_bytes, page_num=0, image_url=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01 * (5 - page_num))
+        self.in_flight -= 1
+        return f"page {page_num}: {image_bytes.decode()}"
+
+    async def convert_pages_batch_async(self, images, first_page_num=0, image_urls=None):
+        self.batches.append(first_page_num)
+        return [f"page {first_page_num + i}: {img.decode()}" for i, img in enumerate(images)]
+
+def test_convert_pages_async_keeps_order_and_bounds_concurrency():
+    agent = _FakeAgent()
+    progress = []
+    images = [f"img{i}".encode() for i in range(5)]
+
+    results = asyncio.run(
+        PDFConverter()._convert_pages_async(images, agent, concurrency=2, progress_callback=progress.append)
+    )
+
+    assert results == [f"page {i}: img{i}" for i in range(5)]
+    assert agent.max_in_flight == 2
+    assert progress[-1] == 100
+
+def test_convert_pages_async_groups_pages_into_batches():
+    agent = _FakeAgent()
+    images = [f"img{i}".encode() for i in range(5)]
+
+    results = asyncio.run(PDFConverter()._convert_pages_async(images, agent, batch_size=2))
+
+    assert results == [f"page {i}: img{i}" for i in range(5)]
+    # Pages 0-1 and 2-3 go in batched requests; the trailing page is sent alone.
+    assert sorted(agent.batches) == [0, 2]
+
+def test_convert_pages_async_skips_blank_pages():
+    agent = _FakeAgent()
+    images = [b"img0", b"", b"img2"]
+
+    results = asyncio.run(PDFConverter()._convert_pages_async(images, agent, batch_size=2))
+
+    # The two non-blank pages share one request; the blank one never reaches the agent.
+    assert [r.split(": ")[-1] for r in results] == ["img0", "", "img2"]
+    assert agent.batches == [0]
+
+def test_convert_pages_async_encodes_in_flight_pages_and_releases_them():
+    agent = _FakeAgent()
+    urls = []
+    agent.convert_page_async = lambda image_bytes, page_num=0, image_url=None: _record(urls, image_url)
+    images = [b"img0", b"img1"]
+
+    asyncio.run(PDFConverter()._convert_pages_async(images, agent))
+
+    assert sorted(urls) == [AIAgent.image_data_url(b"img0"), AIAgent.image_data_url(b"img1")]
+    assert images == [None, None]
+
+async def _record(urls, image_url):
+    urls.append(image_url)
+    return ""
+
+class _FakeStreamingClient:
+    """Async client stub whose streamed completions take a little while."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return self._stream()
+
+    async def _stream(self):
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="ok"))])
+
+def test_complete_async_caps_requests_across_agents(tmp_path):
+    client = _FakeStreamingClient()
+    agents = []
+    for i in range(2):
+        agent = AIAgent("sk-test", cache=LLMCache(tmp_path / f"cache{i}.sqlite3"))
+        agent.aclient = client
+        agents.append(agent)
+
+    async def fan_out():
+        calls = [agents[i % 2]._complete_async(model="m", messages=[]) for i in range(3 * ai_agent.MAX_INFLIGHT_REQUESTS)]
+        return await asyncio.gather(*calls)
+
+    results = ai_agent.run_async(fan_out())
+
+    assert results == ["ok"] * (3 * ai_agent.MAX_INFLIGHT_REQUESTS)
+    assert client.max_in_flight == ai_agent.MAX_INFLIGHT_REQUESTS
+
+def test_page_cache_follows_the_cache_policy(tmp_path):
+    cache = LLMCache(tmp_path / "pages.sqlite3")
+    calls = []
+
+    async def complete(**kwargs):
+        calls.append(1)
+        return f"fresh {len(calls)}"
+
+    def transcribe(policy):
+        agent = AIAgent("sk-test", cache=cache, cache_policy=policy)
+        agent._complete_async = complete
+        return ai_agent.run_async(agent.convert_page_async(b"img", image_url="data:"))
+
+    assert transcribe("read_only") == "fresh 1"
+    assert transcribe("enabled") == "fresh 2"
+    assert transcribe("read_only") == "fresh 2"
+    assert transcribe("disabled") == "fresh 3"
+    assert AIAgent("sk-test", cache_policy="disabled").cache is None
+    cache.close()
+
+def test_render_page_returns_empty_bytes_for_blank_pages():
+    doc = fitz.open()
+    doc.new_page()
+    doc.new_page().insert_text((50, 50), "Some content", fontsize=14)
+
+    assert PDFConverter._render_page(doc, 0) == b""
+    assert PDFConverter._render_page(doc, 1)
+    doc.close()
+
+def test_render_page_keeps_sparse_pages():
+    doc = fitz.open()
+    doc.new_page().insert_text((300, 800), "1", fontsize=8)
+    doc.new_page().draw_line((72, 400), (540, 400), width=0.5)
+
+    # A lone page number or rule is little ink, but it is not a blank page.
+    assert PDFConverter._render_page(doc, 0)
+    assert PDFConverter._render_page(doc, 1)
+    doc.close()
+
+def test_render_page_uses_jpeg_only_for_photographic_pages():
+    noise = io.BytesIO()
+    Image.frombytes("RGB", (256, 256), os.urandom(256 * 256 * 3)).save(noise, "PNG")
+    doc = fitz.open()
+    logo_page = doc.new_page()
+    logo_page.insert_image(fitz.Rect(50, 20, 110, 80), stream=noise.getvalue())
+    logo_page.insert_text((50, 120), "$E = mc^2$ with a header logo", fontsize=14)
+    doc.new_page().insert_image(fitz.Rect(0, 0, 595, 842), stream=noise.getvalue())
+
+    assert PDFConverter._render_page(doc, 0).startswith(b"\x89PNG")
+    assert PDFConverter._render_page(doc, 1).startswith(b"\xff\xd8")
+    doc.close()
+
+def test_split_batch_requires_every_page_marker():
+    content = "=== PAGE 1 ===\n# One\n\\(x\\)\n=== PAGE 2 ===\n\n=== PAGE 3 ===\nThree\n```"
+
+    assert AIAgent._split_batch(content, 3) == ["# One\n$x$", "", "Three"]
+    assert AIAgent._split_batch(content, 4) is None
+    assert AIAgent._split_batch("no markers", 1) is None
+
+def test_progress_throttle_coalesces_updates():
+    seen = []
+    emit = PDFConverter._throttle_progress(seen.append, min_interval=60)
+
+    for value in range(1, 101):
+        emit(value)
+
+    # First update passes, the burst is dropped, and 100% always gets through.
+    assert seen == [1, 100]
+
+def test_split_pdf_writes_ordered_chunks(tmp_path):
+    pdf_path = tmp_path / "doc.pdf"
+    doc = fitz.open()
+    for i in range(23):
+        doc.new_page().insert_text((50, 50), f"Page {i}")
+    doc.save(pdf_path)
+    doc.close()
+
+    chunks = PDFConverter().split_pdf(str(pdf_path), 10)
+
+    assert [pathlib.Path(c).name for c in chunks] == [
+        "doc_Part1_Start1.pdf",
+        "doc_Part2_Start11.pdf",
+        "doc_Part3_Start21.pdf",
+    ]
+    page_counts = []
+    for chunk in chunks:
+        with fitz.open(chunk) as chunk_doc:
+            page_counts.append(len(chunk_doc))
+    assert page_counts == [10, 10, 3]
+
+def test_convert_from_memory_names_output_after_path(tmp_path):
+    pdf_path = tmp_path / "mem_Start5.pdf"
+    create_test_pdf(str(pdf_path))
+    pdf_bytes = pdf_path.read_bytes()
+    pdf_path.unlink()
+
+    result = PDFConverter().convert(str(pdf_path), pdf_bytes=pdf_bytes)
+
+    md_path = tmp_path / "mem_Start5.md"
+    assert str(md_path) in result
+    assert "Hello World" in md_path.read_text(encoding="utf-8")
+
+def test_result_cache_replays_previous_conversion(tmp_path):
+    pdf_path = tmp_path / "cached.pdf"
+    create_test_pdf(str(pdf_path))
+    cache = LLMCache(tmp_path / "results.sqlite3")
+    converter = PDFConverter()
+
+    first = converter.convert(str(pdf_path), result_cache=cache)
+    md_path = tmp_path / "cached.md"
+    expected = md_path.read_text(encoding="utf-8")
+    md_path.unlink()
+
+    second = converter.convert(str(pdf_path), result_cache=cache)
+    cache.close()
+
+    assert first.startswith("Success! Saved to:")
+    assert second.startswith("Success! Restored from cache to:")
+    assert md_path.read_text(encoding="utf-8") == expected
+
+def test_result_cache_skips_failed_and_oversized_conversions(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "skipped.pdf"
+    create_test_pdf(str(pdf_path))
+    cache = LLMCache(tmp_path / "results.sqlite3")
+    agent = _FakeAgent()
+    agent.model_name = "m"
+
+    async def failing_page(image_bytes, page_num=0, image_url=None):
+        return "<!-- AI Error: boom -->"
+
+    agent.convert_page_async = failing_page
+    converter = PDFConverter()
+    converter.convert(str(pdf_path), ai_agent=agent, result_cache=cache)
+    monkeypatch.setattr(PDFConverter, "RESULT_CACHE_MAX_CHARS", 10)
+    converter.convert(str(pdf_path), result_cache=cache)
+
+    second_ai = converter.convert(str(pdf_path), ai_agent=agent, result_cache=cache)
+    second_local = converter.convert(str(pdf_path), result_cache=cache)
+    cache.close()
+
+    assert second_ai.startswith("Success! Saved to:")
+    assert second_local.startswith("Success! Saved to:")
+
+def test_new_api_key_leaves_running_agents_clients_open(tmp_path):
+    running = AIAgent("sk-batch", cache=LLMCache(tmp_path / "a.sqlite3"))
+    checked = AIAgent("sk-other", cache=LLMCache(tmp_path / "b.sqlite3"))
+
+    assert checked.aclient is not running.aclient
+    assert not running.aclient.is_closed()
+    assert AIAgent("sk-batch", cache=LLMCache(tmp_path / "c.sqlite3")).aclient is running.aclient
+
+def test_validate_api_key_does_not_open_a_page_cache(monkeypatch):
+    listed = []
+    client = SimpleNamespace(with_options=lambda **_: SimpleNamespace(models=SimpleNamespace(list=lambda: listed.append(1))))
+    monkeypatch.setattr(ai_agent, "_get_clients", lambda api_key: (client, None))
+    monkeypatch.setattr(ai_agent, "LLMCache", None)
+    monkeypatch.setattr(ai_agent, "_VALIDATED_KEYS", set())
+
+    assert ai_agent.validate_api_key("sk-check") == (True, "API Key is valid.")
+    assert ai_agent.validate_api_key("sk-check") == (True, "API Key is valid.")
+    assert listed == [1]
+
+def test_local_worker_entry_point_reports_progress(tmp_path):
+    pdf_path = tmp_path / "local.pdf"
+    create_test_pdf(str(pdf_path))
+    progress = []
+
+    result = local_pool.convert_local(str(pdf_path), "disabled", SimpleNamespace(put=progress.append))
+
+    assert result.startswith("Success! Saved to:")
+    assert progress[-1] == 100
+
 if __name__ == "__main__":
     test_conversion()
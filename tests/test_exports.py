@@ -1,3 +1,4 @@
+import os
 import sys
 from pathlib import Path
 
@@ -36,6 +37,21 @@ def test_static_html_can_embed_local_mathjax(tmp_path: Path):
     assert "mathjax offline" in saved_html
 
 
+def test_local_mathjax_bundle_is_reread_after_it_changes(tmp_path: Path):
+    renderer = NotebookRenderer()
+    doc = build_sample_document()
+    mathjax_bundle = tmp_path / "mathjax.js"
+    mathjax_bundle.write_text("console.log('v1');", encoding="utf-8")
+
+    assert "v1" in renderer.render(doc, mathjax_path=str(mathjax_bundle))
+
+    mathjax_bundle.write_text("console.log('v2');", encoding="utf-8")
+    stat = mathjax_bundle.stat()
+    os.utime(mathjax_bundle, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert "v2" in renderer.render(doc, mathjax_path=str(mathjax_bundle))
+
+
 def test_markdown_export_includes_formulas_and_variables(tmp_path: Path):
     doc = build_sample_document()
 
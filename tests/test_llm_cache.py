@@ -0,0 +1,60 @@
+"""Tests for the on-disk OpenAI response cache."""
+
+import hashlib
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from converter.llm_cache import LLMCache, file_sha256, make_key, make_result_key
+
+
+def test_cache_roundtrip_persists_to_disk(tmp_path: Path):
+    db_path = tmp_path / "cache.sqlite3"
+    key = make_key(b"png-bytes", "prompt", "gpt-4o")
+
+    cache = LLMCache(db_path)
+    assert cache.get(key) is None
+    cache.put(key, "# Page", "gpt-4o")
+    cache.close()
+
+    reopened = LLMCache(db_path)
+    assert reopened.get(key) == "# Page"
+    reopened.close()
+
+
+def test_key_changes_with_image_prompt_and_model():
+    base = make_key(b"img", "prompt", "gpt-4o")
+
+    assert base == make_key(b"img", "prompt", "gpt-4o")
+    assert base != make_key(b"img2", "prompt", "gpt-4o")
+    assert base != make_key(b"img", "prompt v2", "gpt-4o")
+    assert base != make_key(b"img", "prompt", "gpt-4o-mini")
+
+
+def test_result_key_changes_with_content_mode_and_start_page():
+    base = make_result_key(b"%PDF", None)
+
+    assert base == make_result_key(b"%PDF", None, 0)
+    assert base != make_result_key(b"%PDF-2", None)
+    assert base != make_result_key(b"%PDF", "gpt-4o")
+    assert base != make_result_key(b"%PDF", None, 50)
+
+
+def test_result_key_from_path_matches_bytes(tmp_path: Path):
+    payload = b"%PDF" + bytes(range(256)) * 5000
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(payload)
+
+    assert file_sha256(pdf, chunk_size=4096) == hashlib.sha256(payload).hexdigest()
+    assert make_result_key(pdf, "gpt-4o", 3) == make_result_key(payload, "gpt-4o", 3)
+
+
+def test_clear_empties_the_cache(tmp_path: Path):
+    cache = LLMCache(tmp_path / "cache.sqlite3")
+    cache.put("k", "v")
+    cache.clear()
+    assert cache.get("k") is None
+    cache.close()
@@ -0,0 +1,40 @@
+"""Tests for the client-side OpenAI rate limiter."""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from converter.rate_limit import TokenBucket
+
+
+def test_requests_beyond_rpm_wait_for_refill():
+    bucket = TokenBucket(rpm=60, tpm=0)
+
+    waits = [bucket.reserve(0) for _ in range(62)]
+
+    assert all(w == 0 for w in waits[:60])
+    # One request per second refills; later callers queue behind earlier ones.
+    assert 0.9 < waits[60] <= 1.0
+    assert 1.9 < waits[61] <= 2.0
+
+
+def test_token_budget_is_shared_and_capped_per_request():
+    bucket = TokenBucket(rpm=0, tpm=6000)
+
+    assert bucket.reserve(6000) == 0
+    # An oversized request costs at most the whole budget: one full minute.
+    assert 59 < bucket.reserve(10**9) <= 60
+
+
+def test_reconfigure_with_same_limits_keeps_debt():
+    bucket = TokenBucket(rpm=1, tpm=0)
+    bucket.reserve(0)
+
+    bucket.configure(1, 0)
+    assert bucket.reserve(0) > 0
+
+    bucket.configure(0, 0)
+    assert bucket.reserve(0) == 0
@@ -11,6 +11,7 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 from notebook.document import Document, FormulaBlock
+from notebook.renderer import NotebookRenderer
 
 
 def load_fixture(name: str) -> dict:
@@ -59,3 +60,45 @@ def test_arrays_render_in_table():
     assert "arr" in html
     # values should be formatted with two decimals
     assert "0.00" in html and "4.00" in html
+
+
+def test_render_parts_split_blocks_from_summary():
+    doc = Document(
+        [
+            FormulaBlock("a = 2"),
+            FormulaBlock("b = a + 1"),
+        ]
+    )
+    renderer = NotebookRenderer()
+    blocks, summary = renderer.render_parts(doc)
+
+    assert [element_id for element_id, _ in blocks] == [f"block-{b.block_id}" for b in doc.blocks]
+    assert all(f"id='{element_id}'" in html for element_id, html in blocks)
+    assert summary.startswith("<div id='notebook-summary'>")
+    assert "<h3>Variables</h3>" in summary
+
+    page = renderer.render(doc)
+    assert all(html in page for _, html in blocks)
+    assert "<div id='notebook-summary'>" in page
+
+
+def test_reevaluation_reuses_parsed_expressions():
+    from notebook.document import _parse_cached, clear_expression_cache
+
+    doc = Document(
+        [
+            FormulaBlock("g(x) = 2*x"),
+            FormulaBlock("y = g(3) + sqrt(4)"),
+        ]
+    )
+    doc.evaluate()
+    first = doc.blocks[1].numeric_value
+    misses = _parse_cached.cache_info().misses
+
+    doc.evaluate()
+
+    assert _parse_cached.cache_info().misses == misses
+    assert doc.blocks[1].numeric_value == first == 8.0
+
+    clear_expression_cache()
+    assert _parse_cached.cache_info().currsize == 0
@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+import keyring
+import pytest
+from keyring.errors import NoKeyringError
+from PySide6.QtCore import QSettings
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from gui.settings import API_KEY_SETTING, CachedSettings, load_api_key, save_api_key
+
+
+@pytest.fixture
+def settings(tmp_path):
+    return CachedSettings(QSettings(str(tmp_path / "settings.ini"), QSettings.Format.IniFormat))
+
+
+def test_key_is_kept_in_the_keychain(settings, monkeypatch):
+    vault = {}
+    monkeypatch.setattr(keyring, "set_password", lambda service, name, value: vault.__setitem__(name, value))
+    monkeypatch.setattr(keyring, "get_password", lambda service, name: vault.get(name))
+
+    assert save_api_key(settings, "sk-secret")
+
+    assert vault == {API_KEY_SETTING: "sk-secret"}
+    assert settings.value(API_KEY_SETTING) == ""
+    assert load_api_key(settings) == "sk-secret"
+
+
+def test_plain_text_fallback_is_reported(settings, monkeypatch):
+    def no_backend(*_args):
+        raise NoKeyringError("no backend")
+
+    monkeypatch.setattr(keyring, "set_password", no_backend)
+    monkeypatch.setattr(keyring, "get_password", no_backend)
+
+    assert not save_api_key(settings, "sk-secret")
+
+    assert settings.value(API_KEY_SETTING) == "sk-secret"
+    assert load_api_key(settings) == "sk-secret"
+
+
+def test_unexpected_keychain_errors_are_not_swallowed(settings, monkeypatch):
+    def broken(*_args):
+        raise ValueError("bug")
+
+    monkeypatch.setattr(keyring, "set_password", broken)
+
+    with pytest.raises(ValueError):
+        save_api_key(settings, "sk-secret")
+    assert settings.value(API_KEY_SETTING) is None